@@ -1,12 +1,12 @@
 import os
 import logging
+import importlib.util
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (handlers are configured by the entry point, main.py)
 logger = logging.getLogger(__name__)
 
 # API Configuration
@@ -15,41 +15,111 @@ PROJECT_NAME = "Build Your Day API"
 DESCRIPTION = "API for generating personalized day itineraries"
 VERSION = "1.0.0"
 
-# CORS Configuration
-CORS_ORIGINS = [
+# CORS Configuration (exact origins; a frozenset keeps the per-request check O(1))
+CORS_ORIGINS = frozenset({
     "http://localhost:3000",  # Frontend dev server
     "http://localhost:5173",  # Vite dev server
     "https://nav-plan.vercel.app",  # Vercel production
     "https://navplan-production.up.railway.app",  # Railway backend
-]
+})
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """Environment-derived settings, resolved once at startup"""
+    GOOGLE_CLIENT_ID: Optional[str]
+    GOOGLE_MAPS_API_KEY: Optional[str]
+    GOOGLE_API_KEY: Optional[str]
+    OPENROUTER_API_KEY: Optional[str]
+    GEOAPIFY_API_KEY: Optional[str]
+    MONGODB_URI: Optional[str]
+    MONGODB_DB: Optional[str]
+    # Connection pool tuning (overridable per deployment)
+    MONGODB_MAX_POOL_SIZE: int = 200
+    MONGODB_MIN_POOL_SIZE: int = 20
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_SOCKET_TIMEOUT_MS: int = 45000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    MONGODB_HEARTBEAT_FREQUENCY_MS: int = 10000
+    MONGODB_COMPRESSORS: str = "zlib"
+    # Shared response cache; caching is off when unset
+    REDIS_URL: Optional[str] = None
+
+# Modules PyMongo loads for each optional wire compressor, best compressor first
+_COMPRESSOR_MODULES = {
+    "zstd": ("zstandard", "compression.zstd", "backports.zstd"),
+    "snappy": ("snappy",),
+}
+
+def _module_installed(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        # The parent package of a dotted name is missing
+        return False
+
+def _available_compressors() -> str:
+    """
+    Wire compressors to offer MongoDB, best first, limited to those whose
+    optional packages are installed (zlib is in the standard library)
+    """
+    compressors = [
+        name for name, modules in _COMPRESSOR_MODULES.items()
+        if any(_module_installed(module) for module in modules)
+    ]
+    return ",".join(compressors + ["zlib"])
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load .env exactly once and return the cached settings"""
+    load_dotenv()
+    env = os.environ
+    return Settings(
+        GOOGLE_CLIENT_ID=env.get("VITE_GOOGLE_CLIENT_ID"),
+        GOOGLE_MAPS_API_KEY=env.get("VITE_GOOGLE_MAPS_API_KEY"),
+        GOOGLE_API_KEY=env.get("GOOGLE_API_KEY"),
+        OPENROUTER_API_KEY=env.get("OPENROUTER_API_KEY"),
+        GEOAPIFY_API_KEY=env.get("GEOAPIFY_API_KEY"),
+        MONGODB_URI=env.get("MONGODB_URI"),
+        MONGODB_DB=env.get("MONGODB_DB"),
+        MONGODB_MAX_POOL_SIZE=int(env.get("MONGODB_MAX_POOL_SIZE", 200)),
+        MONGODB_MIN_POOL_SIZE=int(env.get("MONGODB_MIN_POOL_SIZE", 20)),
+        MONGODB_MAX_IDLE_TIME_MS=int(env.get("MONGODB_MAX_IDLE_TIME_MS", 300000)),
+        MONGODB_SOCKET_TIMEOUT_MS=int(env.get("MONGODB_SOCKET_TIMEOUT_MS", 45000)),
+        MONGODB_WAIT_QUEUE_TIMEOUT_MS=int(env.get("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+        MONGODB_HEARTBEAT_FREQUENCY_MS=int(env.get("MONGODB_HEARTBEAT_FREQUENCY_MS", 10000)),
+        MONGODB_COMPRESSORS=env.get("MONGODB_COMPRESSORS") or _available_compressors(),
+        REDIS_URL=env.get("REDIS_URL"),
+    )
+
+settings = get_settings()
 
 # Google Auth Configuration
-GOOGLE_CLIENT_ID = os.getenv("VITE_GOOGLE_CLIENT_ID")
+GOOGLE_CLIENT_ID = settings.GOOGLE_CLIENT_ID
 if not GOOGLE_CLIENT_ID:
     logger.warning("VITE_GOOGLE_CLIENT_ID not set in environment variables")
 
 # Google Maps Configuration
-GOOGLE_MAPS_API_KEY = os.getenv("VITE_GOOGLE_MAPS_API_KEY")
+GOOGLE_MAPS_API_KEY = settings.GOOGLE_MAPS_API_KEY
 if not GOOGLE_MAPS_API_KEY:
     logger.warning("VITE_GOOGLE_MAPS_API_KEY not set in environment variables")
 
 # Google AI Configuration
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+GOOGLE_API_KEY = settings.GOOGLE_API_KEY
 if not GOOGLE_API_KEY:
     logger.warning("GOOGLE_API_KEY not set in environment variables")
 
 # OpenRouter AI Configuration
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_API_KEY = settings.OPENROUTER_API_KEY
 if not OPENROUTER_API_KEY:
     logger.warning("OPENROUTER_API_KEY not set in environment variables. Some AI features may not be available.")
 
 # Geoapify Configuration
-GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY")
+GEOAPIFY_API_KEY = settings.GEOAPIFY_API_KEY
 if not GEOAPIFY_API_KEY:
     logger.warning("GEOAPIFY_API_KEY not set in environment variables. POI data generation may be limited.")
 
 # MongoDB Configuration
-MONGODB_URI = os.getenv("MONGODB_URI")
-MONGODB_DB = os.getenv("MONGODB_DB")
+MONGODB_URI = settings.MONGODB_URI
+MONGODB_DB = settings.MONGODB_DB
 if not MONGODB_URI or not MONGODB_DB:
-    raise ValueError("MONGODB_URI and MONGODB_DB must be set in environment variables") 
\ No newline at end of file
+    raise ValueError("MONGODB_URI and MONGODB_DB must be set in environment variables") 
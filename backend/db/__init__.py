@@ -1,16 +1,66 @@
-from pymongo import MongoClient, ASCENDING
+import asyncio
+from pymongo import AsyncMongoClient, MongoClient, IndexModel, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure, OperationFailure
 from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
 import logging
-from config import MONGODB_URI, MONGODB_DB
+from config import settings
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Index creation runs once per process, no matter how many callers ask for it
+_indexes_created = False
+
+# Index specs per collection. Names are explicit and stable; indexes that predate
+# explicit naming keep the server's default name so existing deployments match.
+INDEX_MODELS = {
+    "archived_lists": [
+        # Equality-Sort-Range: filter on user_id, then sort by list date
+        # without an in-memory sort stage
+        IndexModel([("user_id", ASCENDING), ("lists.date", DESCENDING)],
+                   name="user_id_date_idx", background=True),
+        # Lookups and updates that match a single list inside a user's document
+        IndexModel([("user_id", ASCENDING), ("lists._id", ASCENDING)],
+                   name="user_id_list_id_idx", background=True),
+        # Schedule updates that match one saved schedule by its id
+        IndexModel([("user_id", ASCENDING), ("lists.saved_schedules.metadata.schedule_id", ASCENDING)],
+                   name="user_id_schedule_id_idx", background=True),
+    ],
+    "example_lists": [
+        IndexModel([("name", ASCENDING)], name="name_1", background=True),
+    ],
+    "public_pois": [
+        # Geospatial, filter and text search indexes
+        IndexModel([("location", "2dsphere")], name="location_2dsphere", background=True),
+        IndexModel([("category", ASCENDING)], name="category_1", background=True),
+        IndexModel([("source", ASCENDING)], name="source_1", background=True),
+        IndexModel([
+            ("name", "text"),
+            ("category", "text"),
+            ("subcategory", "text"),
+            ("address", "text"),
+            ("amenities", "text")
+        ], name="name_text_category_text_subcategory_text_address_text_amenities_text", background=True),
+    ],
+}
+
+# Indexes from earlier releases that no longer serve any query; dropped on startup
+# so writes stop paying to maintain them
+OBSOLETE_INDEXES = {
+    "archived_lists": [
+        "user_id_1",        # superseded by user_id_date_idx
+        "lists.date_1",     # superseded by user_id_date_idx
+        "lists.name_text",  # no route runs $text against archived lists
+    ],
+}
+
 class DatabaseManager:
     _instance = None
     _client = None
     _db = None
+    _sync_client = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -18,89 +68,145 @@ class DatabaseManager:
             cls._instance._initialize()
         return cls._instance
 
+    @staticmethod
+    def _client_options():
+        """Connection pool and timeout options shared by the async and sync clients"""
+        return {
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+            "socketTimeoutMS": settings.MONGODB_SOCKET_TIMEOUT_MS,
+            "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "heartbeatFrequencyMS": settings.MONGODB_HEARTBEAT_FREQUENCY_MS,
+            "compressors": settings.MONGODB_COMPRESSORS,
+            "connectTimeoutMS": 5000,
+            "serverSelectionTimeoutMS": 5000,
+            "retryWrites": True,
+            "retryReads": True,
+        }
+
     def _initialize(self):
         try:
-            # Configure client with connection pooling and timeout
-            self._client = MongoClient(
-                MONGODB_URI,
-                maxPoolSize=50,
-                minPoolSize=10,
-                maxIdleTimeMS=30000,
-                connectTimeoutMS=5000,
-                serverSelectionTimeoutMS=5000,
-                retryWrites=True,
-                retryReads=True
-            )
-            self._db = self._client[MONGODB_DB]
-            
-            # Create indexes
-            self._create_indexes()
-            
-            # Test connection
-            self._client.admin.command('ping')
-            logger.info("Successfully connected to MongoDB")
-        except ConnectionFailure as e:
-            logger.error(f"Failed to connect to MongoDB: {e}")
-            raise
+            # Async client used by every request path; connects lazily on first use
+            self._client = AsyncMongoClient(settings.MONGODB_URI, **self._client_options())
+            self._db = self._client[settings.MONGODB_DB]
         except Exception as e:
-            logger.error(f"Unexpected error during database initialization: {e}")
+            logger.error("Unexpected error during database initialization: %s", e)
             raise
 
-    def _create_indexes(self):
+    async def connect(self):
+        """Verify the connection, create indexes and warm the pool (called once on app startup)"""
         try:
-            # Create index for user_id for efficient queries
-            self._db.archived_lists.create_index([
-                ("user_id", ASCENDING)
-            ])
-            
-            # Create text index for name field within lists array for search functionality
-            self._db.archived_lists.create_index([
-                ("lists.name", "text")
-            ])
-            
-            # Create index for date within lists array for sorting
-            self._db.archived_lists.create_index([
-                ("lists.date", ASCENDING)
-            ])
-            
-            # Create index for example lists collection
-            self._db.example_lists.create_index([
-                ("name", ASCENDING)
-            ])
-            
-            logger.info("Successfully created database indexes")
-        except OperationFailure as e:
-            logger.error(f"Failed to create indexes: {e}")
+            await self._client.admin.command('ping')
+            logger.info("Successfully connected to MongoDB")
+            await asyncio.gather(self._create_indexes(), self._warm_pool())
+        except ConnectionFailure as e:
+            logger.error("Failed to connect to MongoDB: %s", e)
             raise
 
+    async def _warm_pool(self):
+        """Open minPoolSize sockets up front so the first requests don't pay for them"""
+        await asyncio.gather(*(
+            self._db.archived_lists.find_one({"_id": None}, {"_id": 1})
+            for _ in range(settings.MONGODB_MIN_POOL_SIZE)
+        ))
+
+    async def _create_indexes(self):
+        global _indexes_created
+        if _indexes_created:
+            return
+        for collection_name, models in INDEX_MODELS.items():
+            collection = self._db[collection_name]
+            try:
+                # Skip indexes that already exist so restarts are a no-op
+                existing = await collection.index_information()
+                for index_name in OBSOLETE_INDEXES.get(collection_name, []):
+                    if index_name in existing:
+                        await collection.drop_index(index_name)
+                missing = [model for model in models if model.document["name"] not in existing]
+                if missing:
+                    # All specs for a collection go out in one createIndexes command
+                    await collection.create_indexes(missing)
+            except OperationFailure as e:
+                logger.warning("Failed to create indexes for %s: %s", collection_name, e)
+
+        _indexes_created = True
+        logger.info("Successfully created database indexes")
+
+    @property
+    def db(self):
+        """The shared async database handle"""
+        return self._db
+
     @contextmanager
     def get_database(self):
-        """Context manager for database operations"""
+        """Context manager yielding a synchronous database, for CLI scripts only"""
+        if self._sync_client is None:
+            self._sync_client = MongoClient(settings.MONGODB_URI, **self._client_options())
         try:
-            yield self._db
+            yield self._sync_client[settings.MONGODB_DB]
         except ConnectionFailure as e:
-            logger.error(f"Database connection error: {e}")
+            logger.error("Database connection error: %s", e)
             raise
         except OperationFailure as e:
-            logger.error(f"Database operation error: {e}")
+            logger.error("Database operation error: %s", e)
             raise
         except Exception as e:
-            logger.error(f"Unexpected database error: {e}")
+            logger.error("Unexpected database error: %s", e)
             raise
 
-    def close(self):
-        """Close the database connection"""
-        if self._client:
-            try:
-                self._client.close()
-                logger.info("Database connection closed")
-            except Exception as e:
-                logger.error(f"Error closing database connection: {e}")
-                raise
+    async def close(self):
+        """Close the database connections"""
+        try:
+            if self._client:
+                await self._client.close()
+            if self._sync_client:
+                self._sync_client.close()
+            logger.info("Database connection closed")
+        except Exception as e:
+            logger.error("Error closing database connection: %s", e)
+            raise
 
 # Create a single instance of DatabaseManager
 db_manager = DatabaseManager()
 
+@lru_cache(maxsize=1)
+def get_db():
+    """Get the shared async database handle for request handlers"""
+    return db_manager.db
+
 def get_database():
-    """Get database instance with context manager"""
-    return db_manager.get_database() 
\ No newline at end of file
+    """Get a synchronous database instance with context manager (scripts only)"""
+    return db_manager.get_database()
+
+# Most archive lists kept per user; older lists are dropped by $slice when
+# new ones are pushed, so the user document stays well under the BSON limit
+MAX_ARCHIVED_LISTS = 500
+
+def push_archived_lists(list_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """$push update appending new lists and trimming to the newest MAX_ARCHIVED_LISTS"""
+    return {"$push": {"lists": {"$each": list_docs, "$slice": -MAX_ARCHIVED_LISTS}}}
+
+# Summary fields for archive lists; route handlers that only need these should
+# not pull whole user documents (places and saved schedules stay on the server)
+ARCHIVE_SUMMARY_PROJECTION = {"_id": 0, "lists._id": 1, "lists.name": 1, "lists.date": 1}
+
+async def list_archives(user_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Get a user's archive list summaries (id, name, date), newest first.
+    
+    Args:
+        user_id: The user's unique identifier
+        limit: Optional maximum number of summaries to return
+        
+    Returns:
+        List of summary dicts
+    """
+    user_doc = await get_db().archived_lists.find_one(
+        {"user_id": user_id},
+        ARCHIVE_SUMMARY_PROJECTION,
+        hint="user_id_date_idx"
+    )
+    lists = user_doc.get("lists", []) if user_doc else []
+    lists.sort(key=lambda list_item: list_item["date"], reverse=True)
+    return lists[:limit] if limit else lists
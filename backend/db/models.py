@@ -1,7 +1,42 @@
-from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional, Union
+from pydantic import BaseModel, ConfigDict, Field, AfterValidator, BeforeValidator, PlainSerializer, field_validator
+from typing import Annotated, List, Dict, Any, Literal, Optional, Union
 from datetime import datetime
+from functools import cached_property
 from enum import Enum
+import re
+import sys
+
+# Shared HH:MM time format, compiled once for every model that uses it
+_HHMM = re.compile(r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
+
+def _validate_hhmm(value: str) -> str:
+    if not _HHMM.match(value):
+        raise ValueError("Time must be in HH:MM format")
+    return value
+
+TimeStr = Annotated[str, AfterValidator(_validate_hhmm)]
+
+def _parse_minutes_of_day(value: Any) -> Any:
+    """Accept "HH:MM" at the API boundary and convert it once to minutes past midnight"""
+    if isinstance(value, str):
+        match = _HHMM.match(value)
+        if not match:
+            raise ValueError("Time must be in HH:MM format")
+        hours, minutes = value.split(":")
+        return int(hours) * 60 + int(minutes)
+    return value
+
+def format_minutes_of_day(minutes: int) -> str:
+    """Format minutes past midnight as HH:MM"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+# Times held as integers for schedule arithmetic; still read and written as "HH:MM"
+MinutesOfDay = Annotated[
+    int,
+    Field(ge=0, lt=1440),
+    BeforeValidator(_parse_minutes_of_day),
+    PlainSerializer(format_minutes_of_day, return_type=str),
+]
 
 class TravelMode(str, Enum):
     """Supported travel modes"""
@@ -16,27 +51,59 @@ class BalanceMode(str, Enum):
     BALANCED = "balanced"
     DIVERSE = "diverse"
 
+class MongoModel(BaseModel):
+    """Base for models persisted to MongoDB"""
+
+    def to_mongo(self) -> Dict[str, Any]:
+        """Dump straight through the compiled pydantic-core serializer into a BSON-ready dict"""
+        return self.__pydantic_serializer__.to_python(self, mode="python")
+
 # Core Location and Route Models (consolidated)
 class Coordinates(BaseModel):
     """Standard coordinates model used across the system"""
+    model_config = ConfigDict(frozen=True)
+
     lat: float = Field(..., ge=-90, le=90, description="Latitude")
     lng: float = Field(..., ge=-180, le=180, description="Longitude")
 
+class Place(BaseModel):
+    """A place as sent by the frontend; fields not declared here are kept as-is"""
+    model_config = ConfigDict(extra="allow")
+
+    id: Optional[str] = None
+    name: str
+    location: Optional[Coordinates] = None
+    address: Optional[str] = None
+    placeType: Optional[str] = None
+    rating: Optional[float] = None
+
 class RouteSegment(BaseModel):
     """Model representing a route segment between two places"""
+    model_config = ConfigDict(frozen=True)
+
     start_location: Coordinates
     end_location: Coordinates
     distance: Dict[str, Any]  # {text: "5 km", value: 5000}
     duration: Dict[str, Any]  # {text: "10 mins", value: 600}
     polyline: str = ""
 
+    @field_validator("polyline")
+    @classmethod
+    def _intern_polyline(cls, value: str) -> str:
+        # Legs shared across schedules keep a single copy of their polyline.
+        # str can't be weakly referenced, but interned strings are still freed
+        # once nothing refers to them.
+        return sys.intern(value)
+
 # Enhanced Schedule Models
 class ScheduleItem(BaseModel):
     """Model representing a place visit in the schedule"""
+    model_config = ConfigDict(frozen=True)
+
     place_id: str
     name: str
-    start_time: str = Field(..., pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
-    end_time: str = Field(..., pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
+    start_time: MinutesOfDay
+    end_time: MinutesOfDay
     duration_minutes: int = Field(..., gt=0, le=480)  # Max 8 hours per place
     travel_to_next: Optional[RouteSegment] = None
     ai_review: Optional[str] = None
@@ -56,24 +123,27 @@ class SavedScheduleMetadata(BaseModel):
     schedule_id: str = Field(..., description="Unique identifier for this saved schedule")
     name: str = Field(..., min_length=1, max_length=100, description="User-defined name for this schedule")
     travel_mode: TravelMode = Field(..., description="Transportation mode used")
-    start_time: str = Field(..., pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
-    end_time: str = Field(..., pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
+    start_time: TimeStr
+    end_time: TimeStr
     created_at: datetime = Field(default_factory=datetime.utcnow)
     last_modified: datetime = Field(default_factory=datetime.utcnow)
     is_favorite: bool = False
     
-class SavedSchedule(BaseModel):
+class SavedSchedule(MongoModel):
     """Complete saved schedule with full data"""
     metadata: SavedScheduleMetadata
     schedule: Schedule
     generation_preferences: Optional[Dict[str, Any]] = None  # Store original preferences used
     place_toggles: Dict[str, bool] = Field(default_factory=dict)  # Track which places were enabled/disabled
 
+# Schedule slot numbers available on every archive list
+_ALL_SLOTS = frozenset({1, 2, 3})
+
 # Enhanced Archived List Model
-class ArchivedList(BaseModel):
+class ArchivedList(MongoModel):
     """Enhanced model for archived lists with schedule attachment capability"""
     name: str = Field(..., min_length=1, max_length=100)
-    places: List[Dict[str, Any]]
+    places: List[Place]
     note: Optional[str] = Field(None, max_length=500)
     
     # Public data enrichment (existing)
@@ -84,9 +154,20 @@ class ArchivedList(BaseModel):
     # NEW: Schedule attachment capability
     saved_schedules: List[SavedSchedule] = Field(default_factory=list, max_items=3)
     
+    @cached_property
+    def _schedule_index(self) -> Dict[str, SavedSchedule]:
+        """Saved schedules keyed by schedule_id, built on first lookup"""
+        return {s.metadata.schedule_id: s for s in self.saved_schedules}
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if name == "saved_schedules":
+            # Reassigning the schedules invalidates the cached index
+            self.__dict__.pop("_schedule_index", None)
+
     def get_schedule_by_id(self, schedule_id: str) -> Optional[SavedSchedule]:
         """Helper method to find a schedule by ID"""
-        return next((s for s in self.saved_schedules if s.metadata.schedule_id == schedule_id), None)
+        return self._schedule_index.get(schedule_id)
     
     def can_add_schedule(self) -> bool:
         """Check if more schedules can be added (max 3)"""
@@ -96,9 +177,8 @@ class ArchivedList(BaseModel):
         """Get the next available slot number (1, 2, or 3)"""
         if not self.can_add_schedule():
             return None
-        used_slots = {i for i in range(1, 4) if any(f"Slot {i}" in s.metadata.name for s in self.saved_schedules)}
-        available_slots = set(range(1, 4)) - used_slots
-        return min(available_slots) if available_slots else None
+        used_slots = {i for s in self.saved_schedules for i in _ALL_SLOTS if f"Slot {i}" in s.metadata.name}
+        return min(_ALL_SLOTS - used_slots, default=None)
 
 # Consolidated User Preferences Model
 class UserPreferences(BaseModel):
@@ -111,8 +191,8 @@ class UserPreferences(BaseModel):
 # Consolidated Schedule Request Models
 class BaseScheduleRequest(BaseModel):
     """Base model for schedule requests with common fields"""
-    start_time: str = Field("09:00", pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
-    end_time: str = Field("19:00", pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
+    start_time: TimeStr = "09:00"
+    end_time: TimeStr = "19:00"
     travel_mode: TravelMode = TravelMode.WALKING
     prompt: Optional[str] = Field(None, max_length=500)
     day_overview: Optional[str] = Field(None, max_length=1000)
@@ -120,7 +200,7 @@ class BaseScheduleRequest(BaseModel):
 
 class ScheduleRequest(BaseScheduleRequest):
     """Model for schedule generation from existing places"""
-    places: List[Dict[str, Any]] = Field(default_factory=list)
+    places: List[Place] = Field(default_factory=list)
 
 class LocationScheduleRequest(BaseScheduleRequest):
     """Model for location-based schedule generation"""
@@ -138,8 +218,8 @@ class SaveScheduleRequest(BaseModel):
     schedule_name: str = Field(..., min_length=1, max_length=100)
     schedule: Schedule
     travel_mode: TravelMode
-    start_time: str = Field(..., pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
-    end_time: str = Field(..., pattern=r"^([01]?[0-9]|2[0-3]):[0-5][0-9]$")
+    start_time: TimeStr
+    end_time: TimeStr
     generation_preferences: Optional[Dict[str, Any]] = None
     place_toggles: Dict[str, bool] = Field(default_factory=dict)
     replace_existing_slot: Optional[int] = Field(None, ge=1, le=3)
@@ -150,14 +230,26 @@ class UpdateScheduleRequest(BaseModel):
     schedule_id: str
     updates: Dict[str, Any]  # Flexible updates (name, is_favorite, etc.)
 
+# Archive List Batch Models
+class ArchivedListBatchOperation(BaseModel):
+    """One create/update/delete of an archive list inside a batch request"""
+    method: Literal["POST", "PUT", "DELETE"]
+    id: Optional[str] = None  # Target list id (required for PUT and DELETE)
+    body: Optional[Dict[str, Any]] = None  # ArchivedList for POST, update fields for PUT
+
+class ArchivedListBatchRequest(BaseModel):
+    """Batch of archive list operations applied in a single database round-trip"""
+    requests: List[ArchivedListBatchOperation] = Field(..., min_length=1, max_length=50)
+
 # Public POI Models (cleaned up)
-class PublicPOI(BaseModel):
+class PublicPOI(MongoModel):
     """Model for public POI data from external sources"""
     poi_id: str
     name: str
     location: Dict[str, Any]  # GeoJSON format: {type: "Point", coordinates: [lng, lat]}
     address: str
     category: str
+    category_parts: List[str] = Field(default_factory=list)  # category split on ".", e.g. ["catering", "cafe"]
     subcategory: Optional[str] = None
     opening_hours: Optional[str] = None
     rating: Optional[float] = Field(None, ge=0, le=5)
@@ -0,0 +1,11 @@
+"""
+Gunicorn settings for production: `gunicorn -c gunicorn.conf.py main:app`
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.environ.get("WEB_CONCURRENCY", (os.cpu_count() or 2) * 2 + 1))
+# Access logging costs noticeably per request; the app logs timings itself
+accesslog = None
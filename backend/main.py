@@ -1,25 +1,67 @@
 # To run the backend on localhost:8000, use:
 # uvicorn main:app --host localhost --port 8000 --reload
+import asyncio
 import logging
+import logging.handlers
+import queue
 import time
 import os
+from contextlib import asynccontextmanager, suppress
+import httpx
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError
 from config import PROJECT_NAME, DESCRIPTION, VERSION, CORS_ORIGINS
 from db import db_manager
 from routes import api_router
-from routes.places import router as places_router
+from utils.responses import ORJSONResponse
+from utils.cache import response_cache
+from utils.auth import close_certs_client, listen_for_revocations
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: records are handed to a queue and written to stderr by a
+# listener thread, so enabled logging never blocks the event loop on I/O
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+log_listener = logging.handlers.QueueListener(_log_queue, _log_handler)
+log_listener.start()
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+_queue_handler.setFormatter(logging.Formatter("%(message)s"))  # final format is applied by the listener
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize resources on startup and clean them up on shutdown"""
+    logger.info("Starting %s v%s", PROJECT_NAME, VERSION)
+    await db_manager.connect()
+    # One pooled client for outbound API calls, so connections (and their
+    # TLS handshakes) are reused across requests
+    app.state.http = httpx.AsyncClient(
+        timeout=30.0,
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+    # Logouts on other workers evict the token from this worker's caches
+    revocation_listener = asyncio.create_task(listen_for_revocations())
+    yield
+    logger.info("Shutting down application")
+    revocation_listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await revocation_listener
+    await app.state.http.aclose()
+    await close_certs_client()
+    await db_manager.close()
+    await response_cache.close()
+    log_listener.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title=PROJECT_NAME,
     description=DESCRIPTION,
-    version=VERSION
+    version=VERSION,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -29,58 +71,60 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Paths excluded from per-request logging
+UNLOGGED_PATHS = frozenset({"/"})
+
 # Add performance monitoring middleware
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
+    start_ns = time.perf_counter_ns()
     
     try:
         response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(process_time)
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+        response.headers["X-Process-Time"] = f"{elapsed_ms:.3f}"
         
-        # Log API usage for monitoring
-        logger.info(
-            f"Request: {request.method} {request.url.path} | "
-            f"Client: {request.client.host} | "
-            f"Processing time: {process_time:.4f}s"
-        )
+        # Log API usage for monitoring (health checks are too frequent to be useful)
+        path = request.url.path
+        if path not in UNLOGGED_PATHS and logger.isEnabledFor(logging.INFO):
+            client_host = request.client.host if request.client else "-"
+            logger.info(
+                "Request: %s %s | Client: %s | Processing time: %.3fms",
+                request.method, path, client_host, elapsed_ms
+            )
         
         return response
     except Exception as e:
-        logger.error(f"Request error: {e}")
-        process_time = time.time() - start_time
-        return JSONResponse(
+        logger.error("Request error: %s", e)
+        elapsed_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+        return ORJSONResponse(
             status_code=500,
             content={"detail": "Internal server error"},
-            headers={"X-Process-Time": str(process_time)}
+            headers={"X-Process-Time": f"{elapsed_ms:.3f}"}
         )
 
-# Add global error handler
+# Add global error handlers; route handlers let unexpected errors propagate here
+@app.exception_handler(PyMongoError)
+async def database_exception_handler(request: Request, exc: PyMongoError):
+    logger.exception("Database error in %s %s", request.method, request.url.path)
+    return ORJSONResponse(
+        status_code=500,
+        content={"detail": "Database error"}
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Global exception: {exc}")
-    return JSONResponse(
+    logger.exception("Unhandled error in %s %s", request.method, request.url.path)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "An unexpected error occurred"}
     )
 
-# Include all routes
+# Include all routes (every API router is registered once, under API_PREFIX)
 app.include_router(api_router)
-app.include_router(places_router)
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize resources on application startup"""
-    logger.info(f"Starting {PROJECT_NAME} v{VERSION}")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on application shutdown"""
-    logger.info("Shutting down application")
-    db_manager.close()
 
 @app.get("/")
 async def root():
@@ -14,21 +14,21 @@ sys.path.insert(0, str(backend_dir))
 
 def create_db():
     """Create the database and collections"""
-    from db import get_database
+    from db import get_database, INDEX_MODELS
+    from pymongo.errors import CollectionInvalid
     try:
         with get_database() as db:
-            # Create collections if they don't exist
-            collections = ['archived_lists', 'public_pois', 'example_lists']
-            for collection_name in collections:
-                if collection_name not in db.list_collection_names():
+            # Create collections if they don't exist (one round trip each)
+            for collection_name in INDEX_MODELS:
+                try:
                     db.create_collection(collection_name)
                     print(f"Created collection: {collection_name}")
+                except CollectionInvalid:
+                    pass
             
-            # Create indexes
-            db.archived_lists.create_index("user_id")
-            db.public_pois.create_index([("location", "2dsphere")])
-            db.public_pois.create_index("category")
-            db.example_lists.create_index("name")
+            # Create indexes, one createIndexes command per collection
+            for collection_name, models in INDEX_MODELS.items():
+                db[collection_name].create_indexes(models)
             
             print("Database setup completed successfully")
     except Exception as e:
@@ -44,6 +44,19 @@ def drop_db():
     except Exception as e:
         print(f"Error dropping database: {e}")
 
+def backfill_category_parts():
+    """Store the split category on public POIs imported before category_parts existed"""
+    from db import get_database
+    try:
+        with get_database() as db:
+            result = db.public_pois.update_many(
+                {"category_parts": {"$exists": False}, "category": {"$type": "string"}},
+                [{"$set": {"category_parts": {"$split": ["$category", "."]}}}]
+            )
+            print(f"Backfilled category_parts on {result.modified_count} POIs")
+    except Exception as e:
+        print(f"Error backfilling category_parts: {e}")
+
 def import_public_data(bbox="-74.0,40.7,-73.9,40.8", categories=""):
     """Import public POI datasets for MongoDB challenge"""
     async def run_import():
@@ -79,10 +92,22 @@ def import_public_data(bbox="-74.0,40.7,-73.9,40.8", categories=""):
     
     asyncio.run(run_import())
 
-def run_server():
-    """Run the FastAPI server"""
+def run_server(dev=False):
+    """Run the FastAPI server (auto-reload with --dev, multi-worker otherwise)"""
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    if dev:
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+        return
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="httptools",
+        workers=(os.cpu_count() or 2) * 2 + 1,
+        reload=False,
+        access_log=False
+    )
 
 def main():
     """Main CLI entry point"""
@@ -92,7 +117,8 @@ def main():
         print("  create_db                    - Create database and collections")
         print("  drop-db                      - Drop the database")
         print("  import_public_data [bbox]   - Import public POI data")
-        print("  run                          - Run the development server")
+        print("  backfill_category_parts      - Add category_parts to existing POIs")
+        print("  run [--dev]                  - Run the server (--dev enables auto-reload)")
         return
     
     command = sys.argv[1]
@@ -105,8 +131,10 @@ def main():
         bbox = sys.argv[2] if len(sys.argv) > 2 else "-74.0,40.7,-73.9,40.8"
         categories = sys.argv[3] if len(sys.argv) > 3 else ""
         import_public_data(bbox, categories)
+    elif command == "backfill_category_parts":
+        backfill_category_parts()
     elif command == "run":
-        run_server()
+        run_server(dev="--dev" in sys.argv[2:])
     else:
         print(f"Unknown command: {command}")
 
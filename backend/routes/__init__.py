@@ -2,6 +2,7 @@ from fastapi import APIRouter
 from routes.auth import router as auth_router
 from routes.archived_lists import router as archived_lists_router
 from routes.schedules import router as schedule_router
+from routes.places import router as places_router
 
 # Main router that includes all sub-routers
 api_router = APIRouter()
@@ -10,5 +11,6 @@ api_router = APIRouter()
 api_router.include_router(auth_router)
 api_router.include_router(archived_lists_router)
 api_router.include_router(schedule_router)
+api_router.include_router(places_router)
 
 __all__ = ["api_router"] 
\ No newline at end of file
@@ -1,12 +1,23 @@
+import asyncio
+import base64
 import logging
-from fastapi import APIRouter, Body, HTTPException, Depends
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Body, HTTPException, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Annotated, Dict, Any, List, Optional, Tuple
 from bson.objectid import ObjectId
-from pymongo.errors import PyMongoError
-from db import get_database
-from db.models import ArchivedList, SaveScheduleRequest, UpdateScheduleRequest, SavedSchedule, SavedScheduleMetadata
+from pydantic import TypeAdapter, ValidationError
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.asynchronous.database import AsyncDatabase
+from db import get_db, push_archived_lists
+from db.models import ArchivedList, ArchivedListBatchRequest, Place, SaveScheduleRequest, UpdateScheduleRequest, SavedSchedule, SavedScheduleMetadata
 from utils.auth import get_current_user
+from utils.responses import ORJSONResponse
+from utils.cache import (
+    response_cache, archived_lists_cache_key, ARCHIVED_LISTS_CACHE_TTL,
+    enrichment_cache_key, ENRICHMENT_CACHE_TTL
+)
 from config import API_PREFIX
 from services.ai_service import query_AI_openRouter
 from config import OPENROUTER_API_KEY
@@ -19,334 +30,471 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix=API_PREFIX, tags=["archived-lists"])
 
-@router.post("/archived-lists")
+# Serializes a whole places list in one call instead of one model_dump per place
+_PLACES_ADAPTER = TypeAdapter(List[Place])
+
+def _valid_list_id(list_id: str) -> str:
+    """Path dependency rejecting list ids that are not ObjectId strings before any query runs"""
+    if not ObjectId.is_valid(list_id):
+        raise HTTPException(status_code=400, detail="Invalid list id")
+    return list_id
+
+ListId = Annotated[str, Depends(_valid_list_id)]
+
+def _valid_list_ids(
+    list_ids: List[str] = Body(..., embed=True, min_length=1, max_length=100)
+) -> List[str]:
+    """Body dependency applying the same list id check to every id of a bulk request"""
+    return [_valid_list_id(list_id) for list_id in list_ids]
+
+ListIds = Annotated[List[str], Depends(_valid_list_ids)]
+
+# The shared async database handle, injected so handlers never open their own
+Database = Annotated[AsyncDatabase, Depends(get_db)]
+
+async def _archived_list_body(request: Request) -> ArchivedList:
+    """
+    Validate the raw request body straight into an ArchivedList.
+    
+    pydantic-core parses and validates the JSON bytes in one pass, skipping
+    the intermediate json.loads dict that a Body() parameter would build.
+    """
+    try:
+        return ArchivedList.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+@router.post(
+    "/archived-lists",
+    openapi_extra={"requestBody": {
+        "content": {"application/json": {"schema": ArchivedList.model_json_schema()}},
+        "required": True
+    }}
+)
 async def create_archived_list(
-    archived_list: ArchivedList = Body(...),
+    db: Database,
+    background_tasks: BackgroundTasks,
+    archived_list: ArchivedList = Depends(_archived_list_body),
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
-    Create a new archived list of places with public data enrichment
+    Create a new archived list of places; public data enrichment is filled in
+    by a background task after the response is sent
     """
+    list_doc = _build_list_doc(archived_list)
+    
+    result = await db.archived_lists.update_one(
+        {"user_id": user["id"]},
+        push_archived_lists([list_doc]),
+        upsert=True
+    )
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    background_tasks.add_task(_enrich_list, user["id"], list_doc["_id"], list_doc["places"])
+    
+    return {"id": list_doc["_id"], "message": "Archive list created successfully"}
+
+# Response shape for one archive list in GET /archived-lists, with schedule
+# metadata and public data enrichment, computed by the aggregation itself
+_SAVED_SCHEDULES = {"$ifNull": ["$saved_schedules", []]}
+ARCHIVED_LIST_RESPONSE_PROJECTION = {
+    "_id": 0,
+    "id": "$_id",
+    "name": 1,
+    "places": 1,
+    "note": {"$ifNull": ["$note", None]},
+    "date": 1,
+    "saved_schedules": _SAVED_SCHEDULES,
+    "schedule_count": {"$size": _SAVED_SCHEDULES},
+    "can_add_schedule": {"$lt": [{"$size": _SAVED_SCHEDULES}, 3]},
+    # Public data enrichment
+    "similar_public_places": {"$ifNull": ["$similar_public_places", []]},
+    "popularity_score": {"$ifNull": ["$popularity_score", None]},
+    "ai_generated_tags": {"$ifNull": ["$ai_generated_tags", []]},
+}
+
+# Variant of the list projection for clients that only need schedule
+# metadata; the heavy schedule bodies stay in the database (empty slots
+# stay null so slot numbers line up)
+ARCHIVED_LIST_SUMMARY_PROJECTION = {
+    **ARCHIVED_LIST_RESPONSE_PROJECTION,
+    "saved_schedules": {"$map": {
+        "input": _SAVED_SCHEDULES,
+        "as": "schedule",
+        "in": {"$cond": [
+            {"$eq": [{"$ifNull": ["$$schedule", None]}, None]},
+            None,
+            {"metadata": "$$schedule.metadata"}
+        ]}
+    }},
+}
+
+def _encode_list_cursor(list_item: Dict[str, Any]) -> str:
+    """Encode a list's (date, id) sort key as an opaque pagination cursor"""
+    raw = f"{list_item['date'].isoformat()}|{list_item['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_list_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a pagination cursor back into its (date, id) sort key"""
     try:
-        with get_database() as db:
-            # Enrich with public POI data (consolidated logic)
-            enrichment_data = await _enrich_with_public_data(db, archived_list.places)
-            
-            # Create the list document
-            list_doc = {
-                "_id": str(ObjectId()),
-                "name": archived_list.name,
-                "places": archived_list.places,
-                "note": archived_list.note,
-                "date": datetime.utcnow(),
-                **enrichment_data,  # Spread enrichment data
-                "saved_schedules": []  # Initialize empty schedules array
-            }
-            
-            result = db.archived_lists.update_one(
-                {"user_id": user["id"]},
-                {"$push": {"lists": list_doc}},
-                upsert=True
-            )
-            
-            return {"id": list_doc["_id"], "message": "Archive list created successfully"}
-            
-    except PyMongoError as e:
-        logger.error(f"Database error in create_archived_list: {e}")
-        raise HTTPException(status_code=500, detail="Database error")
-    except Exception as e:
-        logger.error(f"Unexpected error in create_archived_list: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        date_str, list_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(date_str), list_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @router.get("/archived-lists", response_model=List[Dict[str, Any]])
 async def get_archived_lists(
+    db: Database,
+    after: Optional[str] = Query(None, description="Cursor returned in X-Next-Cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="Maximum lists to return"),
+    include_schedules: bool = Query(True, description="Return full saved schedules; false returns only their metadata"),
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
-    Get all archived lists for the current user with schedule information
+    Get archived lists for the current user with schedule information, newest first.
+    
+    With `limit`, results are paged by keyset on (date, id): the cursor for the
+    next page is returned in the X-Next-Cursor header and passed back as `after`.
+    With `include_schedules=false`, saved schedules carry only their metadata;
+    `schedule_count` and `can_add_schedule` are computed server-side either way.
     """
-    try:
-        with get_database() as db:
-            user_lists = db.archived_lists.find_one({"user_id": user["id"]})
-            if not user_lists:
-                return []
-            
-            lists = user_lists.get("lists", [])
-            
-            # Enhanced response with schedule metadata
-            enhanced_lists = []
-            for list_item in lists:
-                enhanced_list = {
-                    "id": list_item["_id"],
-                    "name": list_item["name"],
-                    "places": list_item["places"],
-                    "note": list_item.get("note"),
-                    "date": list_item["date"].isoformat(),
-                    "saved_schedules": list_item.get("saved_schedules", []),
-                    "schedule_count": len(list_item.get("saved_schedules", [])),
-                    "can_add_schedule": len(list_item.get("saved_schedules", [])) < 3,
-                    # Public data enrichment
-                    "similar_public_places": list_item.get("similar_public_places", []),
-                    "popularity_score": list_item.get("popularity_score"),
-                    "ai_generated_tags": list_item.get("ai_generated_tags", [])
-                }
-                enhanced_lists.append(enhanced_list)
-            
-            return enhanced_lists
-            
-    except PyMongoError as e:
-        logger.error(f"Database error in get_archived_lists: {e}")
-        raise HTTPException(status_code=500, detail="Database error")
-    except Exception as e:
-        logger.error(f"Unexpected error in get_archived_lists: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    cache_key = archived_lists_cache_key(user["id"])
+    cache_field = f"{after or ''}:{limit or ''}:{int(include_schedules)}"
+    cached = await response_cache.get_response(cache_key, cache_field)
+    if cached is not None:
+        return cached
+    
+    pipeline: List[Dict[str, Any]] = [
+        {"$match": {"user_id": user["id"]}},
+        {"$unwind": "$lists"},
+        {"$replaceRoot": {"newRoot": "$lists"}},
+    ]
+    if after:
+        after_date, after_id = _decode_list_cursor(after)
+        pipeline.append({"$match": {"$or": [
+            {"date": {"$lt": after_date}},
+            {"date": after_date, "_id": {"$lt": after_id}},
+        ]}})
+    pipeline.append({"$sort": {"date": -1, "_id": -1}})
+    if limit:
+        # Fetch one extra item to learn whether another page exists
+        pipeline.append({"$limit": limit + 1})
+    
+    # Shape each item into the response format server-side
+    pipeline.append({"$project": ARCHIVED_LIST_RESPONSE_PROJECTION if include_schedules else ARCHIVED_LIST_SUMMARY_PROJECTION})
+    
+    # Collect items as batches arrive from the cursor
+    cursor = await db.archived_lists.aggregate(pipeline, batchSize=100)
+    enhanced_lists = []
+    headers = {}
+    async for list_item in cursor:
+        if limit and len(enhanced_lists) == limit:
+            headers["X-Next-Cursor"] = _encode_list_cursor(enhanced_lists[-1])
+            break
+        enhanced_lists.append(list_item)
+    
+    # Returned directly so orjson serializes the raw datetimes itself
+    response = ORJSONResponse(enhanced_lists, headers=headers)
+    await response_cache.set_response(
+        cache_key, cache_field, response, ARCHIVED_LISTS_CACHE_TTL, headers=("X-Next-Cursor",)
+    )
+    return response
 
 @router.put("/archived-lists/{list_id}")
 async def update_archived_list(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     update_data: Dict[str, Any] = Body(...),
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Update an existing archived list (consolidated update logic)
     """
-    try:
-        with get_database() as db:
-            # Build update fields dynamically (existing logic)
-            update_fields = {}
-            if "name" in update_data:
-                update_fields["lists.$.name"] = update_data["name"]
-            if "places" in update_data:
-                update_fields["lists.$.places"] = update_data["places"]
-            if "note" in update_data:
-                update_fields["lists.$.note"] = update_data["note"]
-            
-            if not update_fields:
-                raise HTTPException(status_code=400, detail="No valid fields to update")
-            
-            result = db.archived_lists.update_one(
-                {"user_id": user["id"], "lists._id": list_id},
-                {"$set": update_fields}
-            )
-            
-            if result.modified_count == 0:
-                raise HTTPException(status_code=404, detail="List not found")
-            
-            return {"ok": True, "message": "Archive list updated successfully"}
-            
-    except PyMongoError as e:
-        logger.error(f"Database error in update_archived_list: {e}")
-        raise HTTPException(status_code=500, detail="Database error")
-    except Exception as e:
-        logger.error(f"Unexpected error in update_archived_list: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    update_fields = _list_update_fields(update_data)
+    if not update_fields:
+        raise HTTPException(status_code=400, detail="No valid fields to update")
+    
+    result = await db.archived_lists.update_one(
+        {"user_id": user["id"], "lists._id": list_id},
+        {"$set": update_fields},
+        array_filters=[{"list._id": list_id}]
+    )
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="List not found")
+    
+    return {"ok": True, "message": "Archive list updated successfully"}
 
 @router.delete("/archived-lists/{list_id}")
 async def delete_archived_list(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Delete an archived list and all its saved schedules
     """
-    try:
-        with get_database() as db:
-            result = db.archived_lists.update_one(
-                {"user_id": user["id"]},
-                {"$pull": {"lists": {"_id": list_id}}}
-            )
-            
-            if result.modified_count == 0:
-                raise HTTPException(status_code=404, detail="List not found")
-            
-            return {"ok": True, "message": "Archive list deleted successfully"}
-            
-    except PyMongoError as e:
-        logger.error(f"Database error in delete_archived_list: {e}")
-        raise HTTPException(status_code=500, detail="Database error")
-    except Exception as e:
-        logger.error(f"Unexpected error in delete_archived_list: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    result = await db.archived_lists.update_one(
+        {"user_id": user["id"]},
+        {"$pull": {"lists": {"_id": list_id}}}
+    )
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="List not found")
+    
+    return {"ok": True, "message": "Archive list deleted successfully"}
+
+@router.delete("/archived-lists")
+async def delete_archived_lists(
+    db: Database,
+    list_ids: ListIds,
+    user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Delete several archived lists (and their saved schedules) in one update
+    """
+    result = await db.archived_lists.update_one(
+        {"user_id": user["id"]},
+        {"$pull": {"lists": {"_id": {"$in": list_ids}}}}
+    )
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="No matching lists found")
+    
+    return {"ok": True, "message": "Archive lists deleted successfully"}
+
+@router.post("/archived-lists:batch")
+async def batch_archived_lists(
+    db: Database,
+    background_tasks: BackgroundTasks,
+    batch: ArchivedListBatchRequest = Body(...),
+    user: Dict[str, Any] = Depends(get_current_user)
+):
+    """
+    Apply several archive list creates/updates/deletes in one request.
+    
+    Operations are checked against the user's current lists, then every valid
+    one is sent to MongoDB in a single ordered bulk_write. The response holds
+    one status per operation, in request order.
+    """
+    user_doc = await db.archived_lists.find_one(
+        {"user_id": user["id"]},
+        {"_id": 0, "lists._id": 1},
+        hint="user_id_list_id_idx"
+    )
+    existing_ids = {lst["_id"] for lst in user_doc.get("lists", [])} if user_doc else set()
+    
+    responses: List[Dict[str, Any]] = []
+    operations = []
+    deleted_ids: List[str] = []
+    created_docs: List[Dict[str, Any]] = []
+    for op in batch.requests:
+        if op.method == "POST":
+            try:
+                archived_list = ArchivedList.model_validate(op.body or {})
+            except ValidationError as e:
+                responses.append({"id": op.id, "status": 400, "body": {"detail": e.errors(include_url=False)}})
+                continue
+            list_doc = _build_list_doc(archived_list)
+            created_docs.append(list_doc)
+            responses.append({"id": op.id, "status": 201, "body": {"id": list_doc["_id"]}})
+        elif op.id not in existing_ids:
+            responses.append({"id": op.id, "status": 404, "body": {"detail": "List not found"}})
+        elif op.method == "PUT":
+            update_fields = _list_update_fields(op.body or {})
+            if not update_fields:
+                responses.append({"id": op.id, "status": 400, "body": {"detail": "No valid fields to update"}})
+                continue
+            operations.append(UpdateOne(
+                {"user_id": user["id"], "lists._id": op.id},
+                {"$set": update_fields},
+                array_filters=[{"list._id": op.id}]
+            ))
+            responses.append({"id": op.id, "status": 200, "body": {"ok": True}})
+        else:
+            existing_ids.discard(op.id)
+            deleted_ids.append(op.id)
+            responses.append({"id": op.id, "status": 200, "body": {"ok": True}})
+    
+    if deleted_ids:
+        # Deletes commute with the other operations (later ones on a deleted
+        # id were already rejected), so they collapse into one $pull at the end
+        operations.append(UpdateOne({"user_id": user["id"]}, {"$pull": {"lists": {"_id": {"$in": deleted_ids}}}}))
+    if created_docs:
+        # New lists can't be targeted by other operations in the same batch, so
+        # they are all pushed in one $each, after deletes have freed their slots
+        operations.append(UpdateOne({"user_id": user["id"]}, push_archived_lists(created_docs), upsert=True))
+    if operations:
+        await db.archived_lists.bulk_write(operations, ordered=True)
+        await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    for list_doc in created_docs:
+        background_tasks.add_task(_enrich_list, user["id"], list_doc["_id"], list_doc["places"])
+    
+    return {"responses": responses}
 
 # NEW: Archive Schedule Management Routes
 
 @router.post("/archived-lists/{list_id}/schedules")
 async def save_schedule_to_archive(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     request: SaveScheduleRequest = Body(...),
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Save a schedule to an archive list (max 3 schedules per list)
     """
-    try:
-        with get_database() as db:
-            # Validate the archive list exists and belongs to user
-            user_lists = db.archived_lists.find_one({"user_id": user["id"]})
-            if not user_lists:
-                raise HTTPException(status_code=404, detail="No archive lists found")
-            
-            target_list = next((lst for lst in user_lists.get("lists", []) if lst["_id"] == list_id), None)
-            if not target_list:
-                raise HTTPException(status_code=404, detail="Archive list not found")
-            
-            # Check schedule limit
-            current_schedules = target_list.get("saved_schedules", [])
-            if len(current_schedules) >= 3 and not request.replace_existing_slot:
-                raise HTTPException(status_code=400, detail="Maximum 3 schedules per archive list. Use replace_existing_slot to overwrite.")
-            
-            # Generate unique schedule ID
-            schedule_id = str(uuid.uuid4())
-            
-            # Create schedule metadata
-            metadata = SavedScheduleMetadata(
-                schedule_id=schedule_id,
-                name=request.schedule_name,
-                travel_mode=request.travel_mode,
-                start_time=request.start_time,
-                end_time=request.end_time,
-                created_at=datetime.utcnow(),
-                last_modified=datetime.utcnow(),
-                is_favorite=False
-            )
-            
-            # Create saved schedule
-            saved_schedule = SavedSchedule(
-                metadata=metadata,
-                schedule=request.schedule,
-                generation_preferences=request.generation_preferences,
-                place_toggles=request.place_toggles
-            )
-            
-            # Handle slot replacement or addition
-            if request.replace_existing_slot and 1 <= request.replace_existing_slot <= 3:
-                # Replace specific slot
-                slot_index = request.replace_existing_slot - 1
-                if slot_index < len(current_schedules):
-                    # Replace existing schedule
-                    result = db.archived_lists.update_one(
-                        {"user_id": user["id"], "lists._id": list_id},
-                        {"$set": {f"lists.$.saved_schedules.{slot_index}": saved_schedule.dict()}}
-                    )
-                else:
-                    # Add to specific slot (extend array if needed)
-                    while len(current_schedules) <= slot_index:
-                        current_schedules.append(None)
-                    current_schedules[slot_index] = saved_schedule.dict()
-                    result = db.archived_lists.update_one(
-                        {"user_id": user["id"], "lists._id": list_id},
-                        {"$set": {"lists.$.saved_schedules": current_schedules}}
-                    )
-            else:
-                # Add to next available slot
-                result = db.archived_lists.update_one(
-                    {"user_id": user["id"], "lists._id": list_id},
-                    {"$push": {"lists.$.saved_schedules": saved_schedule.dict()}}
-                )
-            
-            if result.modified_count == 0:
-                raise HTTPException(status_code=500, detail="Failed to save schedule")
-            
-            return {
-                "ok": True,
-                "schedule_id": schedule_id,
-                "message": f"Schedule '{request.schedule_name}' saved successfully",
-                "slot_number": request.replace_existing_slot or len(current_schedules) + 1
-            }
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error saving schedule to archive: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    # Generate unique schedule ID
+    schedule_id = str(uuid.uuid4())
+    
+    # Create schedule metadata
+    metadata = SavedScheduleMetadata(
+        schedule_id=schedule_id,
+        name=request.schedule_name,
+        travel_mode=request.travel_mode,
+        start_time=request.start_time,
+        end_time=request.end_time,
+        created_at=datetime.utcnow(),
+        last_modified=datetime.utcnow(),
+        is_favorite=False
+    )
+    
+    # Create saved schedule
+    saved_schedule = SavedSchedule(
+        metadata=metadata,
+        schedule=request.schedule,
+        generation_preferences=request.generation_preferences,
+        place_toggles=request.place_toggles
+    )
+    
+    # Handle slot replacement or addition; each is one conditional update,
+    # so the list is never read back and the 3-slot limit holds atomically
+    if request.replace_existing_slot:
+        # Setting an index past the end pads the array with empty (null) slots
+        slot_number = request.replace_existing_slot
+        result = await db.archived_lists.update_one(
+            {"user_id": user["id"], "lists._id": list_id},
+            {"$set": {f"lists.$.saved_schedules.{slot_number - 1}": saved_schedule.to_mongo()}}
+        )
+        saved = result.modified_count > 0
+    else:
+        # Add to next available slot, only while fewer than 3 slots are used
+        updated = await db.archived_lists.find_one_and_update(
+            {"user_id": user["id"], "lists": {"$elemMatch": {"_id": list_id, "saved_schedules.2": {"$exists": False}}}},
+            {"$push": {"lists.$.saved_schedules": saved_schedule.to_mongo()}},
+            projection={"_id": 0, "lists.$": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        saved = updated is not None
+        slot_number = len(updated["lists"][0]["saved_schedules"]) if saved else None
+    
+    if not saved:
+        # Only failures pay for a second lookup, to tell a missing list from a full one
+        if not await db.archived_lists.find_one({"user_id": user["id"], "lists._id": list_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Archive list not found")
+        if request.replace_existing_slot:
+            raise HTTPException(status_code=500, detail="Failed to save schedule")
+        raise HTTPException(status_code=400, detail="Maximum 3 schedules per archive list. Use replace_existing_slot to overwrite.")
+    
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    
+    return {
+        "ok": True,
+        "schedule_id": schedule_id,
+        "message": f"Schedule '{request.schedule_name}' saved successfully",
+        "slot_number": slot_number
+    }
 
 @router.get("/archived-lists/{list_id}/schedules")
 async def get_archive_schedules(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Get all saved schedules for an archive list
     """
-    try:
-        with get_database() as db:
-            user_lists = db.archived_lists.find_one({"user_id": user["id"]})
-            if not user_lists:
-                raise HTTPException(status_code=404, detail="No archive lists found")
-            
-            target_list = next((lst for lst in user_lists.get("lists", []) if lst["_id"] == list_id), None)
-            if not target_list:
-                raise HTTPException(status_code=404, detail="Archive list not found")
-            
-            schedules = target_list.get("saved_schedules", [])
-            
-            # Add slot information to each schedule
-            enhanced_schedules = []
-            for i, schedule in enumerate(schedules):
-                if schedule:  # Handle None slots
-                    enhanced_schedule = {
-                        **schedule,
-                        "slot_number": i + 1,
-                        "is_empty_slot": False
-                    }
-                    enhanced_schedules.append(enhanced_schedule)
-                else:
-                    enhanced_schedules.append({
-                        "slot_number": i + 1,
-                        "is_empty_slot": True
-                    })
-            
-            return {
-                "archive_list_id": list_id,
-                "archive_list_name": target_list["name"],
-                "schedules": enhanced_schedules,
-                "total_slots": 3,
-                "used_slots": len([s for s in schedules if s is not None]),
-                "available_slots": 3 - len([s for s in schedules if s is not None])
+    cache_key = archived_lists_cache_key(user["id"])
+    cache_field = f"schedules:{list_id}"
+    cached = await response_cache.get_response(cache_key, cache_field)
+    if cached is not None:
+        return cached
+    
+    # Only the matched list comes back, not every list the user has
+    user_lists = await db.archived_lists.find_one(
+        {"user_id": user["id"], "lists._id": list_id},
+        {"_id": 0, "lists.$": 1}
+    )
+    if not user_lists:
+        raise HTTPException(status_code=404, detail="Archive list not found")
+    
+    target_list = user_lists["lists"][0]
+    
+    schedules = target_list.get("saved_schedules", [])
+    
+    # Add slot information to each schedule
+    enhanced_schedules = []
+    for i, schedule in enumerate(schedules):
+        if schedule:  # Handle None slots
+            enhanced_schedule = {
+                **schedule,
+                "slot_number": i + 1,
+                "is_empty_slot": False
             }
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting archive schedules: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+            enhanced_schedules.append(enhanced_schedule)
+        else:
+            enhanced_schedules.append({
+                "slot_number": i + 1,
+                "is_empty_slot": True
+            })
+    
+    response = ORJSONResponse({
+        "archive_list_id": list_id,
+        "archive_list_name": target_list["name"],
+        "schedules": enhanced_schedules,
+        "total_slots": 3,
+        "used_slots": len([s for s in schedules if s is not None]),
+        "available_slots": 3 - len([s for s in schedules if s is not None])
+    })
+    await response_cache.set_response(cache_key, cache_field, response, ARCHIVED_LISTS_CACHE_TTL)
+    return response
 
 @router.get("/archived-lists/{list_id}/schedules/{schedule_id}")
 async def get_archive_schedule(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     schedule_id: str,
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Get a specific saved schedule from an archive list
     """
-    try:
-        with get_database() as db:
-            user_lists = db.archived_lists.find_one({"user_id": user["id"]})
-            if not user_lists:
-                raise HTTPException(status_code=404, detail="No archive lists found")
-            
-            target_list = next((lst for lst in user_lists.get("lists", []) if lst["_id"] == list_id), None)
-            if not target_list:
-                raise HTTPException(status_code=404, detail="Archive list not found")
-            
-            schedules = target_list.get("saved_schedules", [])
-            target_schedule = next((s for s in schedules if s and s.get("metadata", {}).get("schedule_id") == schedule_id), None)
-            
-            if not target_schedule:
-                raise HTTPException(status_code=404, detail="Schedule not found")
-            
-            return target_schedule
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting archive schedule: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    # Only the matched list comes back, not every list the user has
+    user_lists = await db.archived_lists.find_one(
+        {"user_id": user["id"], "lists._id": list_id},
+        {"_id": 0, "lists.$": 1}
+    )
+    if not user_lists:
+        raise HTTPException(status_code=404, detail="Archive list not found")
+    
+    target_list = user_lists["lists"][0]
+    
+    schedules = target_list.get("saved_schedules", [])
+    target_schedule = next((s for s in schedules if s and s.get("metadata", {}).get("schedule_id") == schedule_id), None)
+    
+    if not target_schedule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    return ORJSONResponse(target_schedule)
 
 @router.put("/archived-lists/{list_id}/schedules/{schedule_id}")
 async def update_archive_schedule(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     schedule_id: str,
     request: UpdateScheduleRequest = Body(...),
     user: Dict[str, Any] = Depends(get_current_user)
@@ -354,83 +502,96 @@ async def update_archive_schedule(
     """
     Update a saved schedule (name, favorite status, etc.)
     """
-    try:
-        with get_database() as db:
-            # Find the schedule and update it
-            user_lists = db.archived_lists.find_one({"user_id": user["id"]})
-            if not user_lists:
-                raise HTTPException(status_code=404, detail="No archive lists found")
-            
-            # Find list and schedule indices
-            list_index = next((i for i, lst in enumerate(user_lists.get("lists", [])) if lst["_id"] == list_id), None)
-            if list_index is None:
-                raise HTTPException(status_code=404, detail="Archive list not found")
-            
-            schedules = user_lists["lists"][list_index].get("saved_schedules", [])
-            schedule_index = next((i for i, s in enumerate(schedules) if s and s.get("metadata", {}).get("schedule_id") == schedule_id), None)
-            
-            if schedule_index is None:
-                raise HTTPException(status_code=404, detail="Schedule not found")
-            
-            # Build update fields
-            update_fields = {}
-            if "name" in request.updates:
-                update_fields[f"lists.{list_index}.saved_schedules.{schedule_index}.metadata.name"] = request.updates["name"]
-            if "is_favorite" in request.updates:
-                update_fields[f"lists.{list_index}.saved_schedules.{schedule_index}.metadata.is_favorite"] = request.updates["is_favorite"]
-            
-            # Always update last_modified
-            update_fields[f"lists.{list_index}.saved_schedules.{schedule_index}.metadata.last_modified"] = datetime.utcnow()
-            
-            if not update_fields:
-                raise HTTPException(status_code=400, detail="No valid fields to update")
-            
-            result = db.archived_lists.update_one(
-                {"user_id": user["id"]},
-                {"$set": update_fields}
-            )
-            
-            if result.modified_count == 0:
-                raise HTTPException(status_code=500, detail="Failed to update schedule")
-            
-            return {"ok": True, "message": "Schedule updated successfully"}
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating archive schedule: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    # Build update fields, addressing the schedule through array filters
+    # rather than list/schedule indices read in a separate query
+    schedule_path = "lists.$[list].saved_schedules.$[schedule].metadata"
+    update_fields = {}
+    if "name" in request.updates:
+        update_fields[f"{schedule_path}.name"] = request.updates["name"]
+    if "is_favorite" in request.updates:
+        update_fields[f"{schedule_path}.is_favorite"] = request.updates["is_favorite"]
+    
+    # Always update last_modified
+    update_fields[f"{schedule_path}.last_modified"] = datetime.utcnow()
+    
+    result = await db.archived_lists.update_one(
+        {"user_id": user["id"], "lists": {"$elemMatch": {"_id": list_id, "saved_schedules.metadata.schedule_id": schedule_id}}},
+        {"$set": update_fields},
+        array_filters=[{"list._id": list_id}, {"schedule.metadata.schedule_id": schedule_id}]
+    )
+    
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    
+    return {"ok": True, "message": "Schedule updated successfully"}
 
 @router.delete("/archived-lists/{list_id}/schedules/{schedule_id}")
 async def delete_archive_schedule(
-    list_id: str,
+    db: Database,
+    list_id: ListId,
     schedule_id: str,
     user: Dict[str, Any] = Depends(get_current_user)
 ):
     """
     Delete a saved schedule from an archive list
     """
-    try:
-        with get_database() as db:
-            # Remove the schedule from the array
-            result = db.archived_lists.update_one(
-                {"user_id": user["id"], "lists._id": list_id},
-                {"$pull": {"lists.$.saved_schedules": {"metadata.schedule_id": schedule_id}}}
-            )
-            
-            if result.modified_count == 0:
-                raise HTTPException(status_code=404, detail="Schedule not found or already deleted")
-            
-            return {"ok": True, "message": "Schedule deleted successfully"}
-            
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting archive schedule: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    # Remove the schedule from the array
+    result = await db.archived_lists.update_one(
+        {"user_id": user["id"], "lists._id": list_id},
+        {"$pull": {"lists.$.saved_schedules": {"metadata.schedule_id": schedule_id}}}
+    )
+    await response_cache.invalidate(archived_lists_cache_key(user["id"]))
+    
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="Schedule not found or already deleted")
+    
+    return {"ok": True, "message": "Schedule deleted successfully"}
 
 # Helper Functions (consolidated logic)
 
+# Public POIs within this distance of a saved place count as similar to it
+ENRICHMENT_RADIUS_METERS = 200
+
+def _build_list_doc(archived_list: ArchivedList) -> Dict[str, Any]:
+    """Build the stored document for a new archive list, with enrichment left empty"""
+    return {
+        "_id": str(ObjectId()),
+        "name": archived_list.name,
+        "places": _PLACES_ADAPTER.dump_python(archived_list.places, exclude_unset=True),
+        "note": archived_list.note,
+        "date": datetime.utcnow(),
+        # Filled in by _enrich_list once the list is stored
+        "similar_public_places": [],
+        "popularity_score": None,
+        "ai_generated_tags": [],
+        "saved_schedules": []  # Initialize empty schedules array
+    }
+
+async def _enrich_list(user_id: str, list_id: str, places: List[Dict[str, Any]]) -> None:
+    """Background task: compute public data enrichment for a stored list and save it"""
+    db = get_db()
+    try:
+        enrichment_data = await _enrich_with_public_data(db, places)
+        result = await db.archived_lists.update_one(
+            {"user_id": user_id, "lists._id": list_id},
+            {"$set": {f"lists.$.{field}": value for field, value in enrichment_data.items()}}
+        )
+    except Exception:
+        logger.exception("Public data enrichment failed for list %s", list_id)
+        return
+    if result.modified_count:
+        await response_cache.invalidate(archived_lists_cache_key(user_id))
+
+def _list_update_fields(update_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map editable list fields in an update body to $set paths on the list matched by the "list" array filter"""
+    return {
+        f"lists.$[list].{field}": update_data[field]
+        for field in ("name", "places", "note")
+        if field in update_data
+    }
+
 async def _enrich_with_public_data(db, places: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Consolidated public data enrichment logic
@@ -439,48 +600,67 @@ async def _enrich_with_public_data(db, places: List[Dict[str, Any]]) -> Dict[str
         similar_places = []
         total_popularity = 0
         place_count = 0
-        ai_tags = []
+        ai_tags: Dict[str, None] = {}
         
+        points = []
         for place in places:
             lat = place.get("geometry", {}).get("location", {}).get("lat", 0)
             lng = place.get("geometry", {}).get("location", {}).get("lng", 0)
-            
             if lat and lng:
-                # Find nearby public POIs
-                nearby_pois = db.public_pois.find({
-                    "location": {
-                        "$near": {
-                            "$geometry": {"type": "Point", "coordinates": [lng, lat]},
-                            "$maxDistance": 200  # 200 meters
-                        }
-                    }
-                }).limit(2)
+                points.append((lat, lng))
+        if not points:
+            return {"similar_public_places": [], "popularity_score": None, "ai_generated_tags": []}
+        
+        # Lists over the same places get the same enrichment until POIs change
+        cache_key = enrichment_cache_key(points)
+        cached = await response_cache.get_value(cache_key)
+        if cached is not None:
+            return orjson.loads(cached)
+        
+        # The 2 closest POIs within range of each place, nearest first. $near
+        # caps each query server-side; the queries run concurrently, so the
+        # wait is one round trip ($geoNear can't run per place inside $facet)
+        nearest = await asyncio.gather(*(
+            db.public_pois.find(
+                {"location": {"$near": {
+                    "$geometry": {"type": "Point", "coordinates": [lng, lat]},
+                    "$maxDistance": ENRICHMENT_RADIUS_METERS
+                }}},
+                {"_id": 0, "poi_id": 1, "rating": 1, "category": 1, "category_parts": 1}
+            ).hint("location_2dsphere").limit(2).to_list(length=None)
+            for lat, lng in points
+        ))
+        
+        for place_pois in nearest:
+            for poi in place_pois:
+                similar_places.append(poi["poi_id"])
+                if poi.get("rating"):
+                    total_popularity += poi["rating"]
+                    place_count += 1
                 
-                for poi in nearby_pois:
-                    similar_places.append(poi["poi_id"])
-                    if poi.get("rating"):
-                        total_popularity += poi["rating"]
-                        place_count += 1
-                    
-                    # Collect categories for AI tags
-                    if poi.get("category"):
-                        category_parts = poi["category"].split(".")
-                        ai_tags.extend(category_parts)
+                # Collect categories for AI tags (first 5 distinct, in order seen)
+                if poi.get("category") and len(ai_tags) < 5:
+                    for part in poi.get("category_parts") or poi["category"].split("."):
+                        ai_tags.setdefault(part, None)
+                        if len(ai_tags) == 5:
+                            break
         
         # Calculate average popularity score
         popularity_score = (total_popularity / place_count) if place_count > 0 else None
         
         # Generate AI tags from categories
-        unique_tags = list(set(ai_tags))[:5]  # Top 5 unique tags
+        unique_tags = list(ai_tags)
         
-        return {
+        enrichment_data = {
             "similar_public_places": similar_places[:10],  # Limit to 10
             "popularity_score": popularity_score,
             "ai_generated_tags": unique_tags
         }
+        await response_cache.set_value(cache_key, orjson.dumps(enrichment_data), ENRICHMENT_CACHE_TTL)
+        return enrichment_data
         
     except Exception as e:
-        logger.warning(f"Error enriching with public data: {e}")
+        logger.warning("Error enriching with public data: %s", e)
         return {
             "similar_public_places": [],
             "popularity_score": None,
@@ -1,11 +1,9 @@
 import logging
-from fastapi import APIRouter, Request, HTTPException, Response, Depends
-from starlette.responses import JSONResponse
-from google.oauth2 import id_token
-from google.auth.transport import requests as grequests
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response, Depends
+from pydantic import BaseModel
 from typing import Dict, Any
-from utils.auth import get_current_user
-from config import GOOGLE_CLIENT_ID, API_PREFIX
+from utils.auth import get_current_user, request_token, revoke_token, user_from_claims, verify_google_token
+from config import API_PREFIX
 from services.user_service import user_service
 
 # Configure logging
@@ -14,38 +12,32 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix=API_PREFIX, tags=["auth"])
 
+class GoogleAuthRequest(BaseModel):
+    token: str
+
 @router.post("/auth/google")
-async def google_auth(request: Request):
+async def google_auth(body: GoogleAuthRequest, background_tasks: BackgroundTasks):
     """
     Authenticate with Google OAuth and set session cookie
     """
     try:
-        data = await request.json()
-        token = data.get("token")
+        token = body.token
         if not token:
             raise HTTPException(status_code=400, detail="Missing token")
         
-        idinfo = id_token.verify_oauth2_token(token, grequests.Request(), GOOGLE_CLIENT_ID)
-        user = {
-            "id": idinfo["sub"],
-            "email": idinfo["email"],
-            "name": idinfo.get("name"),
-            "picture": idinfo.get("picture"),
-        }
+        user = user_from_claims(await verify_google_token(token))
         
-        # Initialize new user with example list (this will only add if they don't have it)
-        try:
-            await user_service.ensure_user_has_example_list(user["id"])
-        except Exception as e:
-            logger.warning(f"Failed to add example list to user {user['id']}: {e}")
+        # Initialize new user with example list (this will only add if they don't
+        # have it) after the response is sent; failures are logged by the service
+        background_tasks.add_task(user_service.ensure_user_has_example_list, user["id"])
         
         # Return user data with token for frontend to store
-        return JSONResponse({
+        return {
             "user": user,
             "token": token
-        })
+        }
     except Exception as e:
-        logger.error(f"Google auth error: {e}")
+        logger.error("Google auth error: %s", e)
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @router.get("/me")
@@ -56,9 +48,12 @@ async def me(user: Dict[str, Any] = Depends(get_current_user)):
     return {"user": user}
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
     """
-    Logout and clear session cookie
+    Logout, revoke the current token and clear session cookie
     """
+    token = request_token(request)
+    if token:
+        await revoke_token(token)
     response.delete_cookie("session")
     return {"ok": True} 
\ No newline at end of file
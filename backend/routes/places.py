@@ -1,20 +1,120 @@
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel, Field
-from config import API_PREFIX
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, Field, ValidationError
+from config import API_PREFIX, settings
+from utils.cache import (
+    response_cache, places_search_cache_key, place_details_cache_key,
+    PLACES_SEARCH_CACHE_TTL, PLACE_DETAILS_CACHE_TTL
+)
+import asyncio
 import httpx
-import os
-from typing import Optional
-import json
+import logging
+import orjson
+from typing import Any, Awaitable, Callable, Dict, Optional, Type
+
+# Configure logging
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix=API_PREFIX, tags=["places"])
 
-GOOGLE_API_KEY = os.getenv("VITE_GOOGLE_MAPS_API_KEY")
+GOOGLE_API_KEY = settings.GOOGLE_MAPS_API_KEY
 
 if not GOOGLE_API_KEY:
     # Use a more descriptive error message as this is a critical setup issue
     raise ValueError("VITE_GOOGLE_MAPS_API_KEY environment variable not set. Please set it in your .env file or environment variables.")
 
 GOOGLE_PLACES_BASE_URL = "https://places.googleapis.com/v1"
+SEARCH_TEXT_URL = f"{GOOGLE_PLACES_BASE_URL}/places:searchText"
+SEARCH_NEARBY_URL = f"{GOOGLE_PLACES_BASE_URL}/places:searchNearby"
+
+# Place fields returned to the frontend; search responses nest them under "places"
+PLACE_FIELDS = (
+    "id", "displayName", "location", "formattedAddress", "types", "rating",
+    "userRatingCount", "photos", "currentOpeningHours", "regularOpeningHours",
+    "websiteUri", "internationalPhoneNumber", "businessStatus", "priceLevel",
+)
+
+# Request headers are identical for every call, so they are built once
+_SEARCH_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Goog-Api-Key": GOOGLE_API_KEY,
+    "X-Goog-FieldMask": ",".join(f"places.{field}" for field in PLACE_FIELDS)
+}
+_DETAILS_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Goog-Api-Key": GOOGLE_API_KEY,
+    "X-Goog-FieldMask": ",".join(PLACE_FIELDS)
+}
+
+# How long a worker may hold the refill lock for a cold key, and how long
+# others wait for its result before calling Google themselves
+CACHE_LOCK_SECONDS = 10
+CACHE_WAIT_INTERVAL = 0.1
+CACHE_WAIT_ATTEMPTS = 30
+
+# Google calls currently running in this worker, by cache key. Identical
+# concurrent requests await the same task instead of each going to Redis
+# and Google (typeahead bursts send the same query several times at once)
+_inflight: Dict[str, "asyncio.Task[bytes]"] = {}
+
+async def _cached_google_call(cache_key: str, expire: int, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+    """
+    Return a cached Google response body, or fetch and cache it.
+    
+    Within a worker, concurrent calls for the same key share one lookup.
+    Across workers, only the one holding the key's lock calls Google on a
+    miss; the rest poll the cache briefly for its result, so a burst of
+    identical requests costs one upstream call.
+    """
+    task = _inflight.get(cache_key)
+    if task is None:
+        # The lookup runs as its own task, owned by _inflight rather than by
+        # the request that started it, so no single caller can cancel it
+        task = asyncio.ensure_future(_fetch_through_cache(cache_key, expire, fetch))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda done: _finish_inflight(cache_key, done))
+    # shield() so a caller disconnecting only cancels its own wait
+    return await asyncio.shield(task)
+
+def _finish_inflight(cache_key: str, task: "asyncio.Task[bytes]") -> None:
+    """Forget a finished lookup; its exception counts as retrieved even if every caller left"""
+    if _inflight.get(cache_key) is task:
+        del _inflight[cache_key]
+    if not task.cancelled():
+        task.exception()
+
+async def _fetch_through_cache(cache_key: str, expire: int, fetch: Callable[[], Awaitable[bytes]]) -> bytes:
+    """Serve a key from Redis, or fetch it under the cross-worker refill lock"""
+    cached = await response_cache.get_value(cache_key)
+    if cached is not None:
+        return cached
+    
+    if not await response_cache.acquire_lock(cache_key, CACHE_LOCK_SECONDS):
+        for _ in range(CACHE_WAIT_ATTEMPTS):
+            await asyncio.sleep(CACHE_WAIT_INTERVAL)
+            cached = await response_cache.get_value(cache_key)
+            if cached is not None:
+                return cached
+        return await fetch()
+    
+    try:
+        body = await fetch()
+        await response_cache.set_value(cache_key, body, expire)
+        return body
+    finally:
+        await response_cache.release_lock(cache_key)
+
+async def _google_post(client: httpx.AsyncClient, url: str, payload: bytes, headers: dict) -> bytes:
+    """POST a JSON payload to Google and return the raw response body"""
+    response = await client.post(url, content=payload, headers=headers)
+    response.raise_for_status()
+    return response.content
+
+async def _google_get(client: httpx.AsyncClient, url: str, headers: dict) -> bytes:
+    """GET a Google resource and return the raw response body"""
+    response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    return response.content
 
 class Coordinates(BaseModel):
     latitude: float
@@ -40,68 +140,95 @@ class SearchNearbyRequest(BaseModel):
     regionCode: str = "US"
     includedTypes: Optional[list[str]] = None
 
-@router.post("/places:searchText")
-async def search_places_proxy(request_body: SearchTextRequest):
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": GOOGLE_API_KEY,
-        "X-Goog-FieldMask": "places.id,places.displayName,places.location,places.formattedAddress,places.types,places.rating,places.userRatingCount,places.photos,places.currentOpeningHours,places.regularOpeningHours,places.websiteUri,places.internationalPhoneNumber,places.businessStatus,places.priceLevel"
-    }
-    async with httpx.AsyncClient(timeout=30.0) as client: # Add a timeout for HTTPX client
+def _json_body(model: Type[BaseModel]) -> Callable[[Request], Awaitable[BaseModel]]:
+    """
+    Dependency validating the raw request body straight into `model`.
+    
+    pydantic-core parses and validates the JSON bytes in one pass, skipping
+    the intermediate json.loads dict that a Body() parameter would build.
+    """
+    async def dependency(request: Request) -> BaseModel:
         try:
-            # model_dump(by_alias=True) is crucial here because of text_query: str = Field(alias="textQuery")
-            # This ensures 'text_query' becomes 'textQuery' for Google's API.
-            # exclude_none=True is good for clean payload
-            payload = request_body.model_dump(by_alias=True, exclude_none=True)
-            print("Payload sent to Google Places API (searchText):", payload)
-            response = await client.post(f"{GOOGLE_PLACES_BASE_URL}/places:searchText", json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            # Print Google's error response for debugging
-            print(f"Google Places API error (searchText): {e.response.status_code} - {e.response.text}")
-            raise HTTPException(status_code=e.response.status_code, detail=json.loads(e.response.text) if e.response.text else "Google API error")
-        except Exception as e:
-            print(f"Proxy error (searchText): {e}") # Log the specific error
-            raise HTTPException(status_code=500, detail=f"Proxy error: {e}")
-
-@router.post("/places:searchNearby")
-async def search_nearby_proxy(request_body: SearchNearbyRequest):
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": GOOGLE_API_KEY,
-        "X-Goog-FieldMask": "places.id,places.displayName,places.location,places.formattedAddress,places.types,places.rating,places.userRatingCount,places.photos,places.currentOpeningHours,places.regularOpeningHours,places.websiteUri,places.internationalPhoneNumber,places.businessStatus,places.priceLevel"
-    }
-    async with httpx.AsyncClient(timeout=30.0) as client: # Add a timeout
-        try:
-            # Ensure by_alias=True for field aliasing if you had any
-            payload = request_body.model_dump(by_alias=True, exclude_none=True)
-            print("Payload sent to Google Places API (searchNearby):", payload)
-            response = await client.post(f"{GOOGLE_PLACES_BASE_URL}/places:searchNearby", json=payload, headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            print(f"Google Places API error (searchNearby): {e.response.status_code} - {e.response.text}")
-            raise HTTPException(status_code=e.response.status_code, detail=json.loads(e.response.text) if e.response.text else "Google API error")
-        except Exception as e:
-            print(f"Proxy error (searchNearby): {e}")
-            raise HTTPException(status_code=500, detail=f"Proxy error: {e}")
+            return model.model_validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+            )
+    return dependency
+
+def _json_body_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAPI requestBody for a route that reads its body through _json_body"""
+    return {"requestBody": {
+        "content": {"application/json": {"schema": model.model_json_schema(by_alias=True)}},
+        "required": True
+    }}
+
+@router.post("/places:searchText", openapi_extra=_json_body_schema(SearchTextRequest))
+async def search_places_proxy(
+    request: Request,
+    request_body: SearchTextRequest = Depends(_json_body(SearchTextRequest))
+):
+    client = request.app.state.http
+    try:
+        # by_alias=True is crucial here because of text_query: str = Field(alias="textQuery")
+        # This ensures 'text_query' becomes 'textQuery' for Google's API.
+        # exclude_none=True is good for clean payload. Serialized straight to
+        # JSON bytes, which are sent to Google as-is
+        payload = request_body.model_dump_json(by_alias=True, exclude_none=True).encode()
+        logger.debug("Payload sent to Google Places API (searchText): %s", payload)
+        body = await _cached_google_call(
+            places_search_cache_key("searchText", payload),
+            PLACES_SEARCH_CACHE_TTL,
+            lambda: _google_post(client, SEARCH_TEXT_URL, payload, _SEARCH_HEADERS)
+        )
+        # Google's JSON is passed through as-is rather than decoded and re-encoded
+        return Response(content=body, media_type="application/json")
+    except httpx.HTTPStatusError as e:
+        # Log Google's error response for debugging
+        logger.warning("Google Places API error (searchText): %s - %s", e.response.status_code, e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=orjson.loads(e.response.content) if e.response.content else "Google API error")
+    except Exception as e:
+        logger.exception("Proxy error (searchText)")
+        raise HTTPException(status_code=500, detail=f"Proxy error: {e}")
+
+@router.post("/places:searchNearby", openapi_extra=_json_body_schema(SearchNearbyRequest))
+async def search_nearby_proxy(
+    request: Request,
+    request_body: SearchNearbyRequest = Depends(_json_body(SearchNearbyRequest))
+):
+    client = request.app.state.http
+    try:
+        # Ensure by_alias=True for field aliasing if you had any
+        payload = request_body.model_dump_json(by_alias=True, exclude_none=True).encode()
+        logger.debug("Payload sent to Google Places API (searchNearby): %s", payload)
+        body = await _cached_google_call(
+            places_search_cache_key("searchNearby", payload),
+            PLACES_SEARCH_CACHE_TTL,
+            lambda: _google_post(client, SEARCH_NEARBY_URL, payload, _SEARCH_HEADERS)
+        )
+        # Google's JSON is passed through as-is rather than decoded and re-encoded
+        return Response(content=body, media_type="application/json")
+    except httpx.HTTPStatusError as e:
+        logger.warning("Google Places API error (searchNearby): %s - %s", e.response.status_code, e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=orjson.loads(e.response.content) if e.response.content else "Google API error")
+    except Exception as e:
+        logger.exception("Proxy error (searchNearby)")
+        raise HTTPException(status_code=500, detail=f"Proxy error: {e}")
 
 @router.get("/places/{place_id}")
-async def get_place_details_proxy(place_id: str):
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": GOOGLE_API_KEY,
-        "X-Goog-FieldMask": "id,displayName,location,formattedAddress,types,rating,userRatingCount,photos,currentOpeningHours,regularOpeningHours,websiteUri,internationalPhoneNumber,businessStatus,priceLevel"
-    }
-    async with httpx.AsyncClient(timeout=30.0) as client: # Add a timeout
-        try:
-            response = await client.get(f"{GOOGLE_PLACES_BASE_URL}/places/{place_id}", headers=headers)
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            print(f"Google Places API error (getPlaceDetails): {e.response.status_code} - {e.response.text}")
-            raise HTTPException(status_code=e.response.status_code, detail=json.loads(e.response.text) if e.response.text else "Google API error")
-        except Exception as e:
-            print(f"Proxy error (getPlaceDetails): {e}")
-            raise HTTPException(status_code=500, detail=f"Proxy error: {e}")
\ No newline at end of file
+async def get_place_details_proxy(place_id: str, request: Request):
+    client = request.app.state.http
+    try:
+        body = await _cached_google_call(
+            place_details_cache_key(place_id),
+            PLACE_DETAILS_CACHE_TTL,
+            lambda: _google_get(client, f"{GOOGLE_PLACES_BASE_URL}/places/{place_id}", _DETAILS_HEADERS)
+        )
+        # Google's JSON is passed through as-is rather than decoded and re-encoded
+        return Response(content=body, media_type="application/json")
+    except httpx.HTTPStatusError as e:
+        logger.warning("Google Places API error (getPlaceDetails): %s - %s", e.response.status_code, e.response.text)
+        raise HTTPException(status_code=e.response.status_code, detail=orjson.loads(e.response.content) if e.response.content else "Google API error")
+    except Exception as e:
+        logger.exception("Proxy error (getPlaceDetails)")
+        raise HTTPException(status_code=500, detail=f"Proxy error: {e}")
\ No newline at end of file
@@ -1,11 +1,16 @@
 import logging
-from fastapi import APIRouter, Body, Depends, HTTPException
-from typing import Dict, Any, Tuple, List
-from db.models import ScheduleRequest, LocationScheduleRequest
+import orjson
+from fastapi import APIRouter, Body, Depends, HTTPException, Response
+from typing import Dict, Any, Tuple, List, Optional
+from db import get_db
+from db.models import Schedule, ScheduleRequest, LocationScheduleRequest
 from services.ai_service import optimize_place_order
 from services.schedule_service import generate_schedule
 from services.public_data_service import public_data_service
 from utils.auth import get_current_user
+from utils.cache import (
+    response_cache, schedule_cache_key, SCHEDULE_CACHE_TTL, SCHEDULE_CACHE_MAX_PROMPT_LENGTH
+)
 from config import API_PREFIX
 
 # Configure logging
@@ -14,6 +19,10 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix=API_PREFIX, tags=["schedules"])
 
+# How far past the requested radius the location search falls back to
+# (25km for the default 5km radius)
+FALLBACK_RADIUS_MULTIPLIER = 5
+
 @router.post("/schedules", response_model=Dict[str, Any])
 async def create_schedule(
     request: ScheduleRequest = Body(...),
@@ -43,37 +52,41 @@ async def create_schedule(
                 detail="At least 3 places are required to create a new schedule"
             )
         
+        # An identical request skips both the AI and the routing work
+        cache_key = _schedule_cache_key(request)
+        if cache_key:
+            cached = await response_cache.get_value(cache_key)
+            if cached is not None:
+                return Response(content=cached, media_type="application/json")
+        
+        # Validated places are handed to the services as plain dicts
+        request_places = [place.model_dump(exclude_unset=True) for place in request.places]
+        
         # Process places - use consistent approach as location-based generation
         if request.day_overview:
-            logger.info(f"Updating existing schedule with travel mode: {request.travel_mode}")
-            places = request.places
+            logger.info("Updating existing schedule with travel mode: %s", request.travel_mode)
+            places = request_places
             day_overview = request.day_overview
         else:
-            logger.info(f"Creating new schedule from {len(request.places)} places with time range: {request.start_time} to {request.end_time}")
+            logger.info("Creating new schedule from %s places with time range: %s to %s", len(request.places), request.start_time, request.end_time)
             
             # Extract preferences from request
-            preferences = None
-            if request.preferences:
-                preferences = {
-                    'must_include': request.preferences.must_include,
-                    'balance_mode': request.preferences.balance_mode,
-                    'max_places': request.preferences.max_places,
-                    'meal_requirements': request.preferences.meal_requirements
-                }
-                logger.info(f"Using user preferences: {preferences}")
+            preferences = request.preferences.model_dump() if request.preferences else None
+            if preferences:
+                logger.info("Using user preferences: %s", preferences)
             
             places, day_overview = await optimize_place_order(
-                request.places,
+                request_places,
                 request.start_time,
                 request.prompt,
                 request.travel_mode,
                 end_time=request.end_time,
                 preferences=preferences
             )
-            logger.info(f"AI selected {len(places)} places for the schedule")
+            logger.info("AI selected %s places for the schedule", len(places))
         
         # Generate the schedule with routing information
-        logger.info(f"Generating schedule with travel mode: {request.travel_mode}")
+        logger.info("Generating schedule with travel mode: %s", request.travel_mode)
         schedule = await generate_schedule(
             places,
             request.start_time,
@@ -83,17 +96,69 @@ async def create_schedule(
         )
         
         # Return the schedule with metadata
-        return {
-            "schedule": schedule,
+        body = orjson.dumps({
+            "schedule": schedule.model_dump(mode="json"),
             "optimized": is_new_schedule,
             "original_place_count": len(request.places),
             "selected_place_count": len(places)
-        }
+        })
+        # Degraded results (AI or routing fell back) are not kept, so a retry
+        # gets a fresh attempt
+        if cache_key and day_overview and _is_fully_routed(schedule):
+            await response_cache.set_value(cache_key, body, SCHEDULE_CACHE_TTL)
+        return Response(content=body, media_type="application/json")
     
     except Exception as e:
-        logger.error(f"Error creating schedule: {e}")
+        logger.error("Error creating schedule: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate schedule: {str(e)}")
 
+def _schedule_cache_key(request: ScheduleRequest) -> Optional[str]:
+    """
+    Cache key for a schedule request, or None when it shouldn't be cached.
+    
+    A new schedule's place order is chosen by the AI, so its places are keyed
+    as a set; an update keeps the client's order and overview, so both are
+    part of the key.
+    """
+    if request.prompt and len(request.prompt) > SCHEDULE_CACHE_MAX_PROMPT_LENGTH:
+        return None
+    place_ids = [place.id for place in request.places]
+    if None in place_ids:
+        return None
+    return schedule_cache_key({
+        "place_ids": place_ids if request.day_overview else sorted(place_ids),
+        "start_time": request.start_time,
+        "end_time": request.end_time,
+        "travel_mode": request.travel_mode,
+        "prompt": request.prompt,
+        "preferences": request.preferences.model_dump(mode="json") if request.preferences else None,
+        "day_overview": request.day_overview,
+    })
+
+def _is_fully_routed(schedule: Schedule) -> bool:
+    """Whether every leg came from Google rather than a distance estimate"""
+    # The last item only carries an empty placeholder segment
+    return all(item.travel_to_next and item.travel_to_next.polyline for item in schedule.items[:-1])
+
+def _poi_to_place(poi: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a public POI document into the place format the scheduler expects"""
+    coords = poi["location"]["coordinates"]  # [lng, lat]
+    # One dict serves as both location and geometry.location; neither is mutated
+    location = {"lat": coords[1], "lng": coords[0]}
+    return {
+        "id": poi["poi_id"],
+        "name": poi["name"],
+        "placeType": poi.get("subcategory", poi["category"]),
+        "address": poi["address"],
+        "location": location,
+        "geometry": {"location": location},
+        "rating": poi.get("rating"),
+        "source": poi["source"],
+        "category": poi["category"],
+        "opening_hours": poi.get("opening_hours"),
+        "note": f"Public POI from {poi['source']} - {poi['category']}"
+    }
+
 @router.post("/schedules/generate-from-location", response_model=Dict[str, Any])
 async def generate_schedule_from_location(
     request: LocationScheduleRequest = Body(...),
@@ -103,8 +168,9 @@ async def generate_schedule_from_location(
     Generate an AI-optimized schedule from public POI data based on user's current location.
     
     1. First, search existing POIs in database within radius
-    2. If insufficient POIs found (< 3), expand search radius
-    3. If still insufficient, generate new POIs from external APIs
+    2. If insufficient, generate new POIs from external APIs
+    3. If still insufficient POIs found (< 3), take the nearest stored POIs
+       within a wider radius
     4. Use vector search + AI to optimize the final schedule
     
     Args:
@@ -115,7 +181,7 @@ async def generate_schedule_from_location(
         Dictionary with generated schedule and metadata about the discovery
     """
     try:
-        logger.info(f"Generating location-based schedule for user {user['id']} at ({request.latitude}, {request.longitude})")
+        logger.info("Generating location-based schedule for user %s at (%s, %s)", user["id"], request.latitude, request.longitude)
         
         # Step 1: Try to find existing POIs in database
         search_text = None
@@ -124,51 +190,43 @@ async def generate_schedule_from_location(
         
         # Start with requested radius
         current_radius = request.radius_meters
-        nearby_pois = []
         
-        # Strategy: Try progressively larger search radii to find enough POIs
-        max_attempts = 3
-        radius_multipliers = [1, 2, 5]  # 5km, 10km, 25km for default 5km radius
+        # Search the requested radius first; this may fetch and store new POIs
+        # from the live APIs when the area is sparse
+        search_radius = current_radius
+        limit = max(100, request.max_places * 3)  # Get many more POIs for better selection
+        logger.info("Searching for POIs within %sm", search_radius)
+        nearby_pois = await public_data_service.search_pois_near_location(
+            latitude=request.latitude,
+            longitude=request.longitude,
+            radius_meters=search_radius,
+            categories=request.categories,
+            search_text=search_text,
+            limit=limit
+        )
+        logger.info("Found %s POIs within %sm", len(nearby_pois), search_radius)
         
-        for attempt in range(max_attempts):
-            search_radius = current_radius * radius_multipliers[attempt]
-            logger.info(f"Attempt {attempt + 1}: Searching for POIs within {search_radius}m")
-            
-            nearby_pois = await public_data_service.search_pois_near_location(
+        # Still too few for a good schedule: take the nearest stored POIs within
+        # a wider radius in one query (preferred categories first, then any)
+        if len(nearby_pois) < 3:
+            search_radius = current_radius * FALLBACK_RADIUS_MULTIPLIER
+            logger.info("Searching nearest POIs within %sm", search_radius)
+            nearby_pois = await public_data_service.search_nearest_pois(
                 latitude=request.latitude,
                 longitude=request.longitude,
-                radius_meters=search_radius,
+                max_distance_meters=search_radius,
                 categories=request.categories,
-                search_text=search_text,
-                limit=max(100, request.max_places * 3)  # Get many more POIs for better selection
+                limit=limit
             )
-            
-            logger.info(f"Found {len(nearby_pois)} POIs within {search_radius}m")
-            
-            # If we have enough POIs for a good schedule, break
-            if len(nearby_pois) >= 3:
-                break
-                
-            # For last attempt, try without category filter to find any POIs
-            if attempt == max_attempts - 1 and len(nearby_pois) < 3:
-                logger.info("Last attempt: Searching without category filter")
-                nearby_pois = await public_data_service.search_pois_near_location(
-                    latitude=request.latitude,
-                    longitude=request.longitude,
-                    radius_meters=search_radius,
-                    categories=None,  # No category filter
-                    search_text=None,  # No text search
-                    limit=max(100, request.max_places * 3)  # Get many more POIs for better selection
-                )
-                logger.info(f"Found {len(nearby_pois)} POIs without filters")
+            logger.info("Found %s POIs within %sm", len(nearby_pois), search_radius)
+            if nearby_pois:
+                search_radius = max(poi["distance_meters"] for poi in nearby_pois)
         
         # Step 2: If still no POIs, provide helpful error with suggestions
         if not nearby_pois:
             # Check if there are ANY POIs in the database
-            from db import get_database
-            with get_database() as db:
-                total_pois = db.public_pois.count_documents({})
-                
+            total_pois = await get_db().public_pois.estimated_document_count()
+
             if total_pois == 0:
                 error_msg = "No POI data available in database. Please import POI data first."
             else:
@@ -180,35 +238,15 @@ async def generate_schedule_from_location(
             
             raise HTTPException(status_code=404, detail=error_msg)
         
-        logger.info(f"Using {len(nearby_pois)} POIs for schedule generation")
+        logger.info("Using %s POIs for schedule generation", len(nearby_pois))
         
-        # Step 3: Convert POIs to schedule format
+        # Step 3: Convert POIs to schedule format, collecting their categories
+        # in the same pass
         places = []
+        categories_found = set()
         for poi in nearby_pois:
-            coords = poi["location"]["coordinates"]  # [lng, lat]
-            
-            place = {
-                "id": poi["poi_id"],
-                "name": poi["name"],
-                "placeType": poi.get("subcategory", poi["category"]),
-                "address": poi["address"],
-                "location": {
-                    "lat": coords[1],
-                    "lng": coords[0]
-                },
-                "geometry": {
-                    "location": {
-                        "lat": coords[1],
-                        "lng": coords[0]
-                    }
-                },
-                "rating": poi.get("rating"),
-                "source": poi["source"],
-                "category": poi["category"],
-                "opening_hours": poi.get("opening_hours"),
-                "note": f"Public POI from {poi['source']} - {poi['category']}"
-            }
-            places.append(place)
+            places.append(_poi_to_place(poi))
+            categories_found.add(poi["category"])
         
         # Step 4: Add current location as starting point if requested
         if request.include_current_location:
@@ -232,21 +270,15 @@ async def generate_schedule_from_location(
                 "note": "Starting location for this route"
             }
             places.insert(0, current_location_place)
-            logger.info(f"Added current location as first place, now have {len(places)} total places")
+            logger.info("Added current location as first place, now have %s total places", len(places))
 
         # Step 5: Create schedule request and optimize with AI 
         logger.info("Running AI optimization on discovered POIs with route planning")
         
         # Extract preferences from request if provided
-        preferences = None
-        if hasattr(request, 'preferences') and request.preferences:
-            preferences = {
-                'must_include': request.preferences.must_include,
-                'balance_mode': request.preferences.balance_mode,
-                'max_places': request.preferences.max_places,
-                'meal_requirements': request.preferences.meal_requirements
-            }
-            logger.info(f"Using user preferences for location-based generation: {preferences}")
+        preferences = request.preferences.model_dump() if request.preferences else None
+        if preferences:
+            logger.info("Using user preferences for location-based generation: %s", preferences)
         
         optimized_places, day_overview = await optimize_place_order(
             places,
@@ -257,7 +289,7 @@ async def generate_schedule_from_location(
             preferences=preferences
         )
         
-        logger.info(f"AI selected {len(optimized_places)} places from {len(places)} nearby POIs")
+        logger.info("AI selected %s places from %s nearby POIs", len(optimized_places), len(places))
         
         # Step 6: Generate final schedule with routing
         schedule = await generate_schedule(
@@ -275,12 +307,12 @@ async def generate_schedule_from_location(
                 "latitude": request.latitude,
                 "longitude": request.longitude,
                 "radius_meters": current_radius,
-                "actual_search_radius": search_radius if 'search_radius' in locals() else current_radius
+                "actual_search_radius": search_radius
             },
             "discovery_stats": {
                 "nearby_pois_found": len(nearby_pois),
                 "places_selected": len(optimized_places),
-                "categories_found": list(set(poi["category"] for poi in nearby_pois)),
+                "categories_found": list(categories_found),
                 "search_text_used": search_text,
                 "search_strategy": "existing_database_pois"
             },
@@ -293,7 +325,5 @@ async def generate_schedule_from_location(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating location-based schedule: {e}")
-        import traceback
-        logger.error(f"Full traceback: {traceback.format_exc()}")
+        logger.exception("Error generating location-based schedule: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate location-based schedule: {str(e)}") 
\ No newline at end of file
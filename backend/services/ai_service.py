@@ -1,12 +1,14 @@
+import asyncio
 import logging
 import json
-import re # Import the re module
 import math
-from typing import List, Dict, Any, Tuple, Optional
+from contextlib import aclosing
+from typing import AsyncIterator, List, Dict, Any, Tuple, Optional
 import httpx
+import orjson
 from config import GOOGLE_API_KEY, OPENROUTER_API_KEY
-from db import get_database
 from db.models import TravelMode
+from utils.cache import response_cache, ai_response_cache_key, AI_RESPONSE_CACHE_TTL
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -21,7 +23,7 @@ try:
         global _embedding_model
         if _embedding_model is None:
             model_name = "all-MiniLM-L6-v2"  # 384 dimensions
-            logger.info(f"Loading sentence transformer model: {model_name}")
+            logger.info("Loading sentence transformer model: %s", model_name)
             _embedding_model = SentenceTransformer(model_name)
             logger.info("✅ Sentence transformer model loaded successfully")
         return _embedding_model
@@ -39,9 +41,12 @@ async def create_place_embedding(place_text: str) -> List[float]:
     """
     try:
         if SENTENCE_TRANSFORMERS_AVAILABLE:
-            model = get_embedding_model()
+            # Loading and running the model is CPU-bound; keep it off the event loop
+            model = await asyncio.to_thread(get_embedding_model)
             if model is not None:
-                embedding = model.encode(place_text, convert_to_tensor=False, show_progress_bar=False)
+                embedding = await asyncio.to_thread(
+                    model.encode, place_text, convert_to_tensor=False, show_progress_bar=False
+                )
                 
                 # Convert to list if it's a numpy array
                 if hasattr(embedding, 'tolist'):
@@ -53,7 +58,7 @@ async def create_place_embedding(place_text: str) -> List[float]:
         return []
                 
     except Exception as e:
-        logger.error(f"Error creating embedding: {e}")
+        logger.error("Error creating embedding: %s", e)
         return []
 
 async def create_query_embedding(query: str) -> List[float]:
@@ -102,7 +107,7 @@ async def preference_based_selection(places: List[Dict[str, Any]], preferences:
         if not places:
             return places
         
-        logger.info(f"PREFERENCE-BASED SELECTION: {len(places)} places | Preferences: {preferences}")
+        logger.info("PREFERENCE-BASED SELECTION: %s places | Preferences: %s", len(places), preferences)
         
         # Extract user preferences
         must_include = preferences.get('must_include', [])  # ['restaurants', 'museums', 'cafes']
@@ -188,7 +193,7 @@ async def preference_based_selection(places: List[Dict[str, Any]], preferences:
                 'bars': 1
             }
         
-        logger.info(f"Category limits based on preferences: {category_limits}")
+        logger.info("Category limits based on preferences: %s", category_limits)
         
         # Simple selection algorithm
         selected_places = []
@@ -227,7 +232,7 @@ async def preference_based_selection(places: List[Dict[str, Any]], preferences:
             available_places = [p for p in available_places if p.get('id') not in selected_place_ids]
             
             if not available_places:
-                logger.info(f"No available {category} places (all may be already selected)")
+                logger.info("No available %s places (all may be already selected)", category)
                 continue
             
             # Use vector search if we have a query, otherwise random selection
@@ -247,7 +252,7 @@ async def preference_based_selection(places: List[Dict[str, Any]], preferences:
                     selected_place_ids.add(place_id)
                     category_counts[category] += 1
             
-            logger.info(f"Selected {category_counts[category]} {category} places")
+            logger.info("Selected %s %s places", category_counts[category], category)
         
         # Phase 2: Fill remaining slots with other categories if needed
         remaining_slots = max_places - len(selected_places)
@@ -283,7 +288,7 @@ async def preference_based_selection(places: List[Dict[str, Any]], preferences:
                     final_counts[user_category] = final_counts.get(user_category, 0) + 1
                     break
         
-        logger.info(f"FINAL SELECTION: {len(selected_places)} places | Distribution: {final_counts}")
+        logger.info("FINAL SELECTION: %s places | Distribution: %s", len(selected_places), final_counts)
         
         # Validate meal requirements are met
         if meal_requirements and final_counts.get('restaurants', 0) == 0:
@@ -292,7 +297,7 @@ async def preference_based_selection(places: List[Dict[str, Any]], preferences:
         return selected_places
         
     except Exception as e:
-        logger.error(f"Error in preference-based selection: {e}")
+        logger.error("Error in preference-based selection: %s", e)
         return places[:12]  # Fallback to first 12 places
 
 async def simple_vector_score(places: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
@@ -328,7 +333,7 @@ async def simple_vector_score(places: List[Dict[str, Any]], query: str) -> List[
         return [place for score, place in scored_places]
         
     except Exception as e:
-        logger.error(f"Error in semantic vector scoring: {e}")
+        logger.error("Error in semantic vector scoring: %s", e)
         return places
 
 async def vector_search_places(places: List[Dict[str, Any]], query: str, top_k: int = None) -> List[Dict[str, Any]]:
@@ -351,7 +356,7 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """
     try:
         if len(vec1) != len(vec2):
-            logger.warning(f"Vector dimension mismatch: {len(vec1)} vs {len(vec2)}")
+            logger.warning("Vector dimension mismatch: %s vs %s", len(vec1), len(vec2))
             return 0.0
         
         # Calculate cosine similarity using numpy-style operations
@@ -368,7 +373,7 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
         return max(-1.0, min(1.0, similarity))
         
     except Exception as e:
-        logger.error(f"Error calculating cosine similarity: {e}")
+        logger.error("Error calculating cosine similarity: %s", e)
         return 0.0
 
 
@@ -399,7 +404,7 @@ async def optimize_place_order(
         if len(places) <= 1:
             return places, None
         
-        logger.info(f"Optimizing order for {len(places)} places")
+        logger.info("Optimizing order for %s places", len(places))
         
         current_location = None
         other_places = places
@@ -427,24 +432,29 @@ async def optimize_place_order(
                 preferences, 
                 prompt_text or ""
             )
-            logger.info(f"Preference-based selection filtered from {len(other_places)} to {len(filtered_other_places)} places")
+            logger.info("Preference-based selection filtered from %s to %s places", len(other_places), len(filtered_other_places))
         
-        # Step 2: AI optimization (current location will be handled separately)
-        optimized_other_places, day_overview = await ai_optimization(
-            filtered_other_places, start_time, prompt_text, travel_mode, end_time
-        )
+        # Step 2: AI optimization (current location will be handled separately).
+        # Even a single place goes to the model for its review, duration and
+        # day overview; only an empty selection skips the round trip
+        if not filtered_other_places:
+            optimized_other_places, day_overview = filtered_other_places, None
+        else:
+            optimized_other_places, day_overview = await ai_optimization(
+                filtered_other_places, start_time, prompt_text, travel_mode, end_time
+            )
         
         # Step 3: Combine results - current location always first
         if current_location:
             final_places = [current_location] + optimized_other_places
-            logger.info(f"Final schedule: current location + {len(optimized_other_places)} optimized places")
+            logger.info("Final schedule: current location + %s optimized places", len(optimized_other_places))
         else:
             final_places = optimized_other_places
         
         return final_places, day_overview
         
     except Exception as e:
-        logger.error(f"Error in optimize_place_order: {e}")
+        logger.error("Error in optimize_place_order: %s", e)
         # If optimization fails, return original order and no overview
         return places, None
 
@@ -473,7 +483,7 @@ async def query_AI_google(prompt: str, api_key: str) -> Dict[str, Any]:
 
 async def query_AI_openRouter(prompt: str, model: str, api_key: str) -> Dict[str, Any]:
     """Query the OpenRouter AI API."""
-    logger.info(f"Calling OpenRouter AI API with model: {model}")
+    logger.info("Calling OpenRouter AI API with model: %s", model)
     async with httpx.AsyncClient(timeout=60.0) as client:
         response = await client.post(
             "https://openrouter.ai/api/v1/chat/completions",
@@ -489,7 +499,7 @@ async def query_AI_openRouter(prompt: str, model: str, api_key: str) -> Dict[str
         
         # Check for HTTP errors
         if response.status_code != 200:
-            logger.error(f"OpenRouter API returned status {response.status_code}: {response.text}")
+            logger.error("OpenRouter API returned status %s: %s", response.status_code, response.text)
             response.raise_for_status()
         
         result = response.json()
@@ -498,11 +508,91 @@ async def query_AI_openRouter(prompt: str, model: str, api_key: str) -> Dict[str
         if "error" in result:
             error_msg = result["error"].get("message", "Unknown error")
             error_code = result["error"].get("code", "unknown")
-            logger.error(f"OpenRouter API error {error_code}: {error_msg}")
+            logger.error("OpenRouter API error %s: %s", error_code, error_msg)
             raise Exception(f"OpenRouter API error: {error_msg}")
         
         return result
 
+async def stream_AI_openRouter(prompt: str, model: str, api_key: str) -> AsyncIterator[str]:
+    """Stream an OpenRouter completion, yielding content deltas as they arrive."""
+    logger.info("Streaming OpenRouter AI API with model: %s", model)
+    async with httpx.AsyncClient(timeout=60.0) as client:
+        async with client.stream(
+            "POST",
+            "https://openrouter.ai/api/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True
+            }
+        ) as response:
+            # Check for HTTP errors
+            if response.status_code != 200:
+                await response.aread()
+                logger.error("OpenRouter API returned status %s: %s", response.status_code, response.text)
+                response.raise_for_status()
+            
+            # Server-sent events; lines starting with ":" are keep-alive comments
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                chunk = orjson.loads(data)
+                
+                # Check for API-level errors in the stream
+                if "error" in chunk:
+                    error_msg = chunk["error"].get("message", "Unknown error")
+                    logger.error("OpenRouter API error %s: %s", chunk["error"].get("code", "unknown"), error_msg)
+                    raise Exception(f"OpenRouter API error: {error_msg}")
+                
+                choices = chunk.get("choices")
+                content = choices[0].get("delta", {}).get("content") if choices else None
+                if content:
+                    yield content
+
+async def _read_json_object(chunks: AsyncIterator[str]) -> str:
+    """
+    Accumulate streamed text until the first top-level JSON object is complete.
+    
+    Text before the opening brace (e.g. a markdown fence) is skipped, and braces
+    inside JSON strings are ignored. If the stream ends first, whatever was
+    received is returned and fails to parse downstream.
+    """
+    text = ""
+    start = -1
+    depth = 0
+    in_string = escaped = False
+    async for chunk in chunks:
+        offset = len(text)
+        text += chunk
+        for i in range(offset, len(text)):
+            char = text[i]
+            if start < 0:
+                if char == "{":
+                    start, depth = i, 1
+            elif in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+    return text[start:] if start >= 0 else text
+
 async def ai_optimization(
     places: List[Dict[str, Any]], 
     start_time: str,
@@ -555,28 +645,27 @@ async def ai_optimization(
             end_time=end_time
         )
         
+        # Identical prompts (same places, times and instructions) reuse the
+        # parsed answer instead of another model round trip
+        cache_key = ai_response_cache_key(openrouter_model if use_openrouter else "google", current_prompt)
+        cached_response = await response_cache.get_value(cache_key)
+        
         ai_response_json: Dict[str, Any]
-        if use_openrouter:
-            logger.info(f"Using OpenRouter model: {openrouter_model}")
-            raw_response = await query_AI_openRouter(current_prompt, openrouter_model, OPENROUTER_API_KEY)
+        if cached_response is not None:
+            logger.info("Using cached AI response")
+            ai_response_json = orjson.loads(cached_response)
+        elif use_openrouter:
+            logger.info("Using OpenRouter model: %s", openrouter_model)
+            # Stop reading as soon as the answer object closes instead of
+            # waiting for the model to finish generating
+            async with aclosing(stream_AI_openRouter(current_prompt, openrouter_model, OPENROUTER_API_KEY)) as chunks:
+                json_text_response = await _read_json_object(chunks)
             
-            if "choices" in raw_response and raw_response["choices"] and "message" in raw_response["choices"][0] and "content" in raw_response["choices"][0]["message"]:
-                content_str = raw_response["choices"][0]["message"]["content"]
-                
-                # Extract JSON from markdown code block if present
-                match = re.search(r'```json\n([\s\S]*?)\n```', content_str)
-                if match:
-                    json_text_response = match.group(1).strip()
-                else:
-                    json_text_response = content_str # Assume it's pure JSON if no markdown block
-
-                try:
-                    ai_response_json = json.loads(json_text_response)
-                except json.JSONDecodeError:
-                    logger.error(f"OpenRouter: Failed to parse content as JSON: {json_text_response}")
-                    raise ValueError("OpenRouter response content was not valid JSON.")
-            else:
-                raise ValueError(f"OpenRouter response did not contain expected content path. Response: {raw_response}")
+            try:
+                ai_response_json = orjson.loads(json_text_response)
+            except orjson.JSONDecodeError:
+                logger.error("OpenRouter: Failed to parse content as JSON: %s", json_text_response)
+                raise ValueError("OpenRouter response content was not valid JSON.")
 
         else:
             logger.info("Using Google AI model.")
@@ -590,7 +679,7 @@ async def ai_optimization(
                  try:
                      ai_response_json = json.loads(json_text_response)
                  except json.JSONDecodeError:
-                     logger.error(f"Google AI: Failed to parse content as JSON: {json_text_response}")
+                     logger.error("Google AI: Failed to parse content as JSON: %s", json_text_response)
                      raise ValueError("Google AI response content was not valid JSON.")
             else:
                 raise ValueError(f"Google AI response did not contain expected content path. Response: {raw_response}")
@@ -638,7 +727,7 @@ async def ai_optimization(
                     filtered_ordered_indices = list(range(len(filtered_places)))
                 
                 # Create final list
-                logger.info(f"AI selected {len(filtered_places)} places out of {len(places)}")
+                logger.info("AI selected %s places out of %s", len(filtered_places), len(places))
                 optimized_places_list = [filtered_places[i] for i in filtered_ordered_indices]
             else:
                 # For existing schedules or if no selection was made, use normal ordering logic
@@ -652,10 +741,10 @@ async def ai_optimization(
                         if found_index is not None:
                             valid_indices.append(found_index)
                         else:
-                            logger.warning(f"AI returned unknown place_id: {idx}")
+                            logger.warning("AI returned unknown place_id: %s", idx)
 
                 if len(valid_indices) != len(places):
-                    logger.warning(f"AI response did not return an index for all places. Original: {len(places)}, Got: {len(valid_indices)}. Will append missing.")
+                    logger.warning("AI response did not return an index for all places. Original: %s, Got: %s. Will append missing.", len(places), len(valid_indices))
                     all_original_indices = list(range(len(places)))
                     missing_indices = [idx for idx in all_original_indices if idx not in valid_indices]
                     valid_indices.extend(missing_indices)
@@ -664,18 +753,18 @@ async def ai_optimization(
 
             # Attach AI reviews and durations to places
             if isinstance(place_reviews_from_ai, list):
-                logger.info(f"AI returned {len(place_reviews_from_ai)} place reviews")
+                logger.info("AI returned %s place reviews", len(place_reviews_from_ai))
                 review_map = {review['place_id']: review['review'] for review in place_reviews_from_ai if 'place_id' in review and 'review' in review}
-                logger.info(f"Review map created with {len(review_map)} entries: {list(review_map.keys())}")
+                logger.info("Review map created with %s entries: %s", len(review_map), list(review_map.keys()))
                 for place in optimized_places_list:
                     place_id = place.get('id')
                     if place_id in review_map:
                         place['ai_review'] = review_map[place_id]
-                        logger.info(f"Attached AI review to place {place_id}: {place['ai_review'][:50]}...")
+                        logger.info("Attached AI review to place %s: %s...", place_id, place["ai_review"][:50])
                     else:
-                        logger.warning(f"No AI review found for place {place_id}")
+                        logger.warning("No AI review found for place %s", place_id)
             else:
-                logger.warning(f"AI did not return place_reviews as list. Got: {type(place_reviews_from_ai)} - {place_reviews_from_ai}")
+                logger.warning("AI did not return place_reviews as list. Got: %s - %s", type(place_reviews_from_ai), place_reviews_from_ai)
                 # Fallback: Add simple default reviews
                 for place in optimized_places_list:
                     place_type = place.get('placeType', 'place')
@@ -696,19 +785,91 @@ async def ai_optimization(
                     if place_id in place_durations and isinstance(place_durations[place_id], int) and place_durations[place_id] > 0:
                         place['duration_minutes'] = place_durations[place_id]
 
+            # Only answers that parsed into a schedule are reused
+            if cached_response is None:
+                await response_cache.set_value(cache_key, orjson.dumps(ai_response_json), AI_RESPONSE_CACHE_TTL)
+
             return optimized_places_list, day_overview if isinstance(day_overview, str) else None
             
         except (KeyError, ValueError) as e:
-            logger.error(f"Error parsing structured AI JSON response: {e}. Full AI Response: {ai_response_json}")
+            logger.error("Error parsing structured AI JSON response: %s. Full AI Response: %s", e, ai_response_json)
             return places, None
             
     except httpx.HTTPStatusError as e:
-        logger.error(f"AI API HTTP error: {e.request.method} {e.request.url} - {e.response.status_code}. Response: {e.response.text}")
+        logger.error("AI API HTTP error: %s %s - %s. Response: %s", e.request.method, e.request.url, e.response.status_code, e.response.text)
         return places, None
     except Exception as e:
-        logger.error(f"Generic error in AI optimization: {e}")
+        logger.error("Generic error in AI optimization: %s", e)
         return places, None
 
+# Static prompt sections, built once at import instead of on every request
+MEAL_PLANNING_GUIDELINES = """
+MEAL SPACING REQUIREMENTS:
+- NEVER place two restaurants consecutively in the schedule
+- ALWAYS have at least 2 non-food places between restaurants
+- Include exactly ONE lunch restaurant (12:00-14:00) unless cafe or snacks
+- Include maximum ONE dinner restaurant (17:30+ if time allows) unless cafe or snacks
+- Cafes/light snacks are separate from main restaurants
+- If you run out of diverse place types, END THE SCHEDULE EARLY rather than repeating restaurants
+- Better to have 4-5 well-spaced places than 6+ with poor spacing
+"""
+
+VISIT_DURATION_GUIDELINES = """
+REALISTIC VISIT DURATIONS (include buffer time):
+- Major museums/galleries: 60-90 minutes maximum
+- Tourist attractions: 45-60 minutes
+- Parks/outdoor spaces: 30-45 minutes for casual visits
+- Main meal restaurants: 60-90 minutes
+- Cafes/dessert shops: 20-30 minutes
+- Shopping/retail: 30-45 minutes
+- Travel time: Account for realistic walking/transit times between places
+"""
+
+SUBSET_OUTPUT_FORMAT = """
+Your response must be a JSON object with the following keys:
+1. "selected_place_indices": Array of indices you recommend [e.g., 0, 2, 5, 8]
+2. "ordered_indices": Same selected indices in your recommended visiting order
+3. "day_overview": Brief summary of the day (2-3 sentences)
+4. "place_reviews": Array of objects with "place_id" (use the ID from the place description) and "review" (1 sentence per place) [e.g., [{"place_id": "ChIJ123", "review": "Great museum with fascinating exhibits"}]]
+5. "place_durations": Object mapping place_id to recommended visit duration in minutes (e.g., {"ChIJ123": 45, "ChIJ456": 60})
+"""
+
+ORDER_OUTPUT_FORMAT = """
+Your response must be a JSON object with the following keys:
+1. "ordered_indices": Array of indices in optimized order [e.g., 0, 2, 1, 3]
+2. "day_overview": Brief summary of the day (2-3 sentences)
+3. "place_reviews": Array of objects with "place_id" (use the ID from the place description) and "review" (1 sentence per place) [e.g., [{"place_id": "ChIJ123", "review": "Perfect spot for lunch with great views"}]]
+4. "place_durations": Object mapping place_id to recommended visit duration in minutes (e.g., {"ChIJ123": 45, "ChIJ456": 60})
+"""
+
+DEFAULT_USER_PREFERENCES = "Prioritize a logical flow with varied activities and well-spaced meals throughout the day."
+
+# Filled with str.format by create_prompt
+OPTIMIZATION_PROMPT_TEMPLATE = """You are an expert travel route optimizer creating a REALISTIC and TIME-CONSTRAINED full-day itinerary.
+
+{time_management_guidelines}
+
+Places (enriched with public data insights):
+{places_description}
+
+{selection_instructions}
+
+{meal_planning_guidelines}
+
+{visit_duration_guidelines}
+
+CRITICAL REQUIREMENTS:
+1. User preferences: {user_preferences}
+2. Travel mode: {travel_mode}
+3. TIME CONSTRAINT: All activities MUST end by {end_time}
+4. MEAL SPACING: NEVER schedule restaurants consecutively - always have 2+ non-food places between meals
+5. QUALITY OVER QUANTITY: End schedule early rather than repeating similar venue types
+6. DIVERSITY: Prioritize variety in place types over total number of places
+7. REALISM: Account for travel time and realistic visit durations
+
+{output_format_str}
+"""
+
 def create_prompt(
     place_data: List[Dict[str, Any]], 
     start_time: str, 
@@ -745,30 +906,6 @@ CRITICAL TIME CONSTRAINTS:
 - NEVER schedule activities beyond {end_time}
 - Include realistic travel time between locations
 - Aim to finish all activities by {end_time} at the latest
-"""
-
-    # Improved meal planning guidelines
-    meal_planning_guidelines = """
-MEAL SPACING REQUIREMENTS:
-- NEVER place two restaurants consecutively in the schedule
-- ALWAYS have at least 2 non-food places between restaurants
-- Include exactly ONE lunch restaurant (12:00-14:00) unless cafe or snacks
-- Include maximum ONE dinner restaurant (17:30+ if time allows) unless cafe or snacks
-- Cafes/light snacks are separate from main restaurants
-- If you run out of diverse place types, END THE SCHEDULE EARLY rather than repeating restaurants
-- Better to have 4-5 well-spaced places than 6+ with poor spacing
-"""
-
-    # Visit duration guidelines with realistic timing
-    visit_duration_guidelines = """
-REALISTIC VISIT DURATIONS (include buffer time):
-- Major museums/galleries: 60-90 minutes maximum
-- Tourist attractions: 45-60 minutes
-- Parks/outdoor spaces: 30-45 minutes for casual visits
-- Main meal restaurants: 60-90 minutes
-- Cafes/dessert shops: 20-30 minutes
-- Shopping/retail: 30-45 minutes
-- Travel time: Account for realistic walking/transit times between places
 """
 
     # Base prompt elements
@@ -784,50 +921,24 @@ PRIORITIZE: meal timing, geographical proximity, variety of experiences.
 ENSURE: The schedule fits within the {total_available_minutes} minute time window.
 """
         
-        output_format_str = """
-Your response must be a JSON object with the following keys:
-1. "selected_place_indices": Array of indices you recommend [e.g., 0, 2, 5, 8]
-2. "ordered_indices": Same selected indices in your recommended visiting order
-3. "day_overview": Brief summary of the day (2-3 sentences)
-4. "place_reviews": Array of objects with "place_id" (use the ID from the place description) and "review" (1 sentence per place) [e.g., [{"place_id": "ChIJ123", "review": "Great museum with fascinating exhibits"}]]
-5. "place_durations": Object mapping place_id to recommended visit duration in minutes (e.g., {"ChIJ123": 45, "ChIJ456": 60})
-"""
+        output_format_str = SUBSET_OUTPUT_FORMAT
     else:
         # For small lists or existing schedules
         selection_instructions = f"""
 Create a realistic full day itinerary from {start_time} to {end_time}, ordering the places optimally.
 ENSURE the schedule fits within the {total_available_minutes} minute time window.
 """
-        output_format_str = """
-Your response must be a JSON object with the following keys:
-1. "ordered_indices": Array of indices in optimized order [e.g., 0, 2, 1, 3]
-2. "day_overview": Brief summary of the day (2-3 sentences)
-3. "place_reviews": Array of objects with "place_id" (use the ID from the place description) and "review" (1 sentence per place) [e.g., [{"place_id": "ChIJ123", "review": "Perfect spot for lunch with great views"}]]
-4. "place_durations": Object mapping place_id to recommended visit duration in minutes (e.g., {"ChIJ123": 45, "ChIJ456": 60})
-"""
+        output_format_str = ORDER_OUTPUT_FORMAT
 
     # Combine all elements to create the full prompt
-    return f"""You are an expert travel route optimizer creating a REALISTIC and TIME-CONSTRAINED full-day itinerary.
-
-{time_management_guidelines}
-
-Places (enriched with public data insights):
-{places_description}
-
-{selection_instructions}
-
-{meal_planning_guidelines}
-
-{visit_duration_guidelines}
-
-CRITICAL REQUIREMENTS:
-1. User preferences: {prompt_text if prompt_text else "Prioritize a logical flow with varied activities and well-spaced meals throughout the day."}
-2. Travel mode: {travel_mode.value if isinstance(travel_mode, TravelMode) else travel_mode}
-3. TIME CONSTRAINT: All activities MUST end by {end_time}
-4. MEAL SPACING: NEVER schedule restaurants consecutively - always have 2+ non-food places between meals
-5. QUALITY OVER QUANTITY: End schedule early rather than repeating similar venue types
-6. DIVERSITY: Prioritize variety in place types over total number of places
-7. REALISM: Account for travel time and realistic visit durations
-
-{output_format_str}
-""" 
\ No newline at end of file
+    return OPTIMIZATION_PROMPT_TEMPLATE.format(
+        time_management_guidelines=time_management_guidelines,
+        places_description=places_description,
+        selection_instructions=selection_instructions,
+        meal_planning_guidelines=MEAL_PLANNING_GUIDELINES,
+        visit_duration_guidelines=VISIT_DURATION_GUIDELINES,
+        user_preferences=prompt_text if prompt_text else DEFAULT_USER_PREFERENCES,
+        travel_mode=travel_mode.value if isinstance(travel_mode, TravelMode) else travel_mode,
+        end_time=end_time,
+        output_format_str=output_format_str
+    )
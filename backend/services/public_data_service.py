@@ -3,22 +3,78 @@ Public Data Service for MongoDB Challenge
 On-demand POI discovery and generation for global cities
 """
 
-import requests
 import asyncio
+import httpx
 import logging
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import os
 from db.models import PublicPOI
-from db import get_database
-from config import GOOGLE_API_KEY
+from db import get_db
+from config import GOOGLE_API_KEY, settings
 import math
 
 logger = logging.getLogger(__name__)
 
+# Geoapify categories fetched when a caller doesn't narrow the search
+DEFAULT_POI_CATEGORIES = [
+    # Food & Dining
+    "catering.restaurant", "catering.cafe", "catering.fast_food", 
+    "catering.bar", "catering.pub", "catering.food_court",
+    "catering.ice_cream", "catering.bakery",
+    
+    # Tourism & Culture
+    "tourism.attraction", "tourism.museum", "tourism.sights",
+    "tourism.gallery", "tourism.zoo", "tourism.aquarium",
+    "tourism.theme_park", "tourism.viewpoint",
+    
+    # Entertainment
+    "entertainment.cinema", "entertainment.theatre", 
+    "entertainment.nightclub", "entertainment.casino",
+    "entertainment.bowling_alley", "entertainment.escape_game",
+    
+    # Leisure & Recreation
+    "leisure.park", "leisure.sports_centre", "leisure.fitness_centre",
+    "leisure.swimming_pool", "leisure.golf_course", "leisure.beach",
+    "leisure.playground", "leisure.garden",
+    
+    # Shopping
+    "commercial.shopping_mall", "commercial.supermarket",
+    "commercial.marketplace", "commercial.department_store",
+    "commercial.bookstore", "commercial.electronics",
+    
+    # Accommodation
+    "accommodation.hotel", "accommodation.hostel", 
+    "accommodation.motel", "accommodation.resort",
+    
+    # Services
+    "healthcare.hospital", "healthcare.dentist", "healthcare.pharmacy",
+    "education.university", "education.school", "education.library",
+    "service.beauty", "service.bank", "service.gas_station"
+]
+
+# Fields of a searched POI used by ranking and by the schedule routes
+POI_SEARCH_PROJECTION = {
+    "_id": 0,
+    "poi_id": 1,
+    "name": 1,
+    "location": 1,
+    "address": 1,
+    "category": 1,
+    "subcategory": 1,
+    "opening_hours": 1,
+    "rating": 1,
+    "source": 1,
+    "distance_meters": 1,
+    "text_score": 1,
+    "relevance_score": 1,
+}
+
+# Maximum in-flight Geoapify requests per fetch, to stay within rate limits
+GEOAPIFY_CONCURRENCY = 4
+
 class PublicDataService:
     def __init__(self):
-        self.geoapify_api_key = os.getenv("GEOAPIFY_API_KEY")
+        self.geoapify_api_key = settings.GEOAPIFY_API_KEY
         
     async def search_pois_near_location(
         self, 
@@ -42,58 +98,110 @@ class PublicDataService:
             List of POI dictionaries with relevance scoring
         """
         try:
-            with get_database() as db:
-                location_pois = db.public_pois.count_documents({
+            db = get_db()
+            
+            # Step 1: Check existing data in MongoDB first. The generation
+            # history count and the search are independent, so they share
+            # one round trip
+            logger.info("Checking existing POI data near (%s, %s)", latitude, longitude)
+            location_pois, existing_pois = await asyncio.gather(
+                db.public_pois.count_documents({
                     "generated_for_location": {"$regex": f"^{latitude:.6f},{longitude:.6f}"}
-                })
-                
-                # Step 1: Check existing data in MongoDB first
-                logger.info(f"Checking existing POI data near ({latitude}, {longitude})")
-                existing_pois = await self._search_existing_pois(
+                }),
+                self._search_existing_pois(
                     db, latitude, longitude, radius_meters, categories, search_text, limit * 3
                 )
-                
-                # Step 2: Smart threshold based on location and previous generations
-                if location_pois > 0:
-                    # If we've generated for this location before, use lower threshold
-                    min_threshold = min(10, limit // 3)
-                    logger.info(f"Using location-aware threshold: {min_threshold} (location previously generated)")
-                else:
-                    # New location, need more comprehensive data
-                    min_threshold = min(25, limit // 2)
-                    logger.info(f"Using new location threshold: {min_threshold} (first time for this area)")
-                
-                if len(existing_pois) >= min_threshold:
-                    logger.info(f"Found {len(existing_pois)} existing POIs - using cached data (threshold: {min_threshold})")
-                    return existing_pois[:limit]
-                
-                # Step 3: Need more data - generate comprehensive dataset from live APIs
-                logger.info(f"Insufficient existing data ({len(existing_pois)} POIs, need {min_threshold}) - generating from live APIs")
-                new_pois = await self._generate_pois_from_apis(
-                    latitude, longitude, radius_meters, categories, 200
-                )
-                
-                # Step 4: Store new POIs in MongoDB (avoiding duplicates)
-                if new_pois:
-                    stored_count = await self._store_new_pois(db, new_pois, existing_pois)
-                    logger.info(f"Stored {stored_count} new POIs in MongoDB")
-                
-                # Step 5: Combine and rank all available POIs
-                all_pois = existing_pois + new_pois
-                enhanced_pois = self._apply_intelligent_ranking(
-                    all_pois, latitude, longitude, search_text, categories
-                )
-                
-                # Step 6: Remove duplicates and return top results
-                unique_pois = self._deduplicate_pois(enhanced_pois)
-                
-                logger.info(f"Final result: {len(unique_pois)} unique POIs for user")
-                return unique_pois[:limit]
-                
+            )
+            
+            # Step 2: Smart threshold based on location and previous generations
+            if location_pois > 0:
+                # If we've generated for this location before, use lower threshold
+                min_threshold = min(10, limit // 3)
+                logger.info("Using location-aware threshold: %s (location previously generated)", min_threshold)
+            else:
+                # New location, need more comprehensive data
+                min_threshold = min(25, limit // 2)
+                logger.info("Using new location threshold: %s (first time for this area)", min_threshold)
+            
+            if len(existing_pois) >= min_threshold:
+                logger.info("Found %s existing POIs - using cached data (threshold: %s)", len(existing_pois), min_threshold)
+                return existing_pois[:limit]
+            
+            # Step 3: Need more data - generate comprehensive dataset from live APIs
+            logger.info("Insufficient existing data (%s POIs, need %s) - generating from live APIs", len(existing_pois), min_threshold)
+            new_pois = await self._generate_pois_from_apis(
+                latitude, longitude, radius_meters, categories, 200
+            )
+            
+            # Step 4: Store new POIs in MongoDB (avoiding duplicates)
+            if new_pois:
+                stored_count = await self._store_new_pois(db, new_pois, existing_pois)
+                logger.info("Stored %s new POIs in MongoDB", stored_count)
+            
+            # Step 5: Combine and rank all available POIs
+            all_pois = existing_pois + new_pois
+            enhanced_pois = self._apply_intelligent_ranking(
+                all_pois, latitude, longitude, search_text, categories
+            )
+            
+            # Step 6: Remove duplicates and return top results
+            unique_pois = self._deduplicate_pois(enhanced_pois)
+            
+            logger.info("Final result: %s unique POIs for user", len(unique_pois))
+            return unique_pois[:limit]
+            
+        except Exception as e:
+            logger.exception("Error in on-demand POI discovery: %s", e)
+            return []
+
+    async def search_nearest_pois(
+        self,
+        latitude: float,
+        longitude: float,
+        max_distance_meters: int,
+        categories: List[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Read-only nearest-first search of stored POIs in one $geoNear aggregation.
+        
+        POIs in the preferred categories come first, then any others by
+        distance, so a single query covers both the filtered and unfiltered
+        fallback. Never calls the live APIs.
+        
+        Args:
+            latitude: Search center latitude
+            longitude: Search center longitude
+            max_distance_meters: Search radius
+            categories: Preferred POI categories
+            limit: Maximum results to return
+            
+        Returns:
+            List of POI dictionaries with distance_meters
+        """
+        pipeline = [
+            {
+                "$geoNear": {
+                    "near": {"type": "Point", "coordinates": [longitude, latitude]},
+                    "distanceField": "distance_meters",
+                    "maxDistance": max_distance_meters,
+                    "spherical": True,
+                    "key": "location"  # pin the location_2dsphere index
+                }
+            }
+        ]
+        if categories:
+            pipeline.extend([
+                {"$addFields": {"category_match": {"$in": ["$category", categories]}}},
+                {"$sort": {"category_match": -1, "distance_meters": 1}}
+            ])
+        pipeline.extend([{"$limit": limit}, {"$project": POI_SEARCH_PROJECTION}])
+        
+        try:
+            cursor = await get_db().public_pois.aggregate(pipeline)
+            return await cursor.to_list(length=None)
         except Exception as e:
-            logger.error(f"Error in on-demand POI discovery: {e}")
-            import traceback
-            logger.error(f"Full traceback: {traceback.format_exc()}")
+            logger.error("Error searching nearest POIs: %s", e)
             return []
 
     async def _search_existing_pois(
@@ -139,7 +247,8 @@ class PublicDataService:
                             },
                             "distanceField": "distance_meters",
                             "maxDistance": radius_meters,
-                            "spherical": True
+                            "spherical": True,
+                            "key": "location"  # pin the location_2dsphere index
                         }
                     }]
                     
@@ -166,7 +275,8 @@ class PublicDataService:
                         },
                         "distanceField": "distance_meters",
                         "maxDistance": radius_meters,
-                        "spherical": True
+                        "spherical": True,
+                        "key": "location"  # pin the location_2dsphere index
                     }
                 })
                 pipeline.append({
@@ -250,12 +360,16 @@ class PublicDataService:
             # Limit results
             pipeline.append({"$limit": limit * 2})
             
-            results = list(db.public_pois.aggregate(pipeline))
-            logger.info(f"MongoDB aggregation found {len(results)} existing POIs")
+            # Return only the fields ranking and schedule building read
+            pipeline.append({"$project": POI_SEARCH_PROJECTION})
+            
+            cursor = await db.public_pois.aggregate(pipeline)
+            results = await cursor.to_list(length=None)
+            logger.info("MongoDB aggregation found %s existing POIs", len(results))
             return results
             
         except Exception as e:
-            logger.error(f"Error searching existing POIs: {e}")
+            logger.error("Error searching existing POIs: %s", e)
             return []
 
     async def _generate_pois_from_apis(
@@ -275,7 +389,7 @@ class PublicDataService:
             return []
             
         try:
-            logger.info(f"Generating comprehensive POI dataset from Geoapify API")
+            logger.info("Generating comprehensive POI dataset from Geoapify API")
             
             # Calculate expanded bounding box for comprehensive coverage
             # Use 2x radius for better coverage of the city area
@@ -292,105 +406,128 @@ class PublicDataService:
             
             # Comprehensive categories for full city coverage
             if not categories:
-                categories = [
-                    # Food & Dining
-                    "catering.restaurant", "catering.cafe", "catering.fast_food", 
-                    "catering.bar", "catering.pub", "catering.food_court",
-                    "catering.ice_cream", "catering.bakery",
-                    
-                    # Tourism & Culture
-                    "tourism.attraction", "tourism.museum", "tourism.sights",
-                    "tourism.gallery", "tourism.zoo", "tourism.aquarium",
-                    "tourism.theme_park", "tourism.viewpoint",
-                    
-                    # Entertainment
-                    "entertainment.cinema", "entertainment.theatre", 
-                    "entertainment.nightclub", "entertainment.casino",
-                    "entertainment.bowling_alley", "entertainment.escape_game",
-                    
-                    # Leisure & Recreation
-                    "leisure.park", "leisure.sports_centre", "leisure.fitness_centre",
-                    "leisure.swimming_pool", "leisure.golf_course", "leisure.beach",
-                    "leisure.playground", "leisure.garden",
-                    
-                    # Shopping
-                    "commercial.shopping_mall", "commercial.supermarket",
-                    "commercial.marketplace", "commercial.department_store",
-                    "commercial.bookstore", "commercial.electronics",
-                    
-                    # Accommodation
-                    "accommodation.hotel", "accommodation.hostel", 
-                    "accommodation.motel", "accommodation.resort",
-                    
-                    # Services
-                    "healthcare.hospital", "healthcare.dentist", "healthcare.pharmacy",
-                    "education.university", "education.school", "education.library",
-                    "service.beauty", "service.bank", "service.gas_station"
-                ]
+                categories = DEFAULT_POI_CATEGORIES
             
-            all_pois = []
+            all_pois = await self._fetch_bbox_pois(bbox, categories, f"{latitude},{longitude}", limit)
             
-            # Generate POIs for each category with higher limits
-            for category in categories:
-                if len(all_pois) >= limit:
-                    break
-                    
-                try:
-                    url = "https://api.geoapify.com/v2/places"
-                    params = {
-                        "categories": category,
-                        "filter": f"rect:{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
-                        "limit": min(50, 50),  # Get 50 POIs per category
-                        "apiKey": self.geoapify_api_key
-                    }
-                    
-                    response = requests.get(url, params=params, timeout=15)
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        for feature in data.get("features", []):
-                            if len(all_pois) >= limit:
-                                break
-                                
-                            props = feature.get("properties", {})
-                            geometry = feature.get("geometry", {})
-                            
-                            if geometry.get("type") == "Point":
-                                coords = geometry.get("coordinates", [])
-                                
-                                poi = {
-                                    "poi_id": f"geoapify_{props.get('place_id', '')}",
-                                    "name": props.get("name", "Unknown"),
-                                    "location": {
-                                        "type": "Point",
-                                        "coordinates": [coords[0], coords[1]]  # [lng, lat]
-                                    },
-                                    "address": props.get("formatted", ""),
-                                    "category": category,
-                                    "subcategory": props.get("categories", [None])[0] if props.get("categories") else None,
-                                    "opening_hours": props.get("opening_hours"),
-                                    "rating": props.get("rating"),
-                                    "source": "geoapify",
-                                    "source_id": props.get("place_id", ""),
-                                    "last_updated": datetime.utcnow(),
-                                    "generated_for_location": f"{latitude},{longitude}"
-                                }
-                                all_pois.append(poi)
-                        
-                        # Rate limiting - be more aggressive to get data faster
-                        await asyncio.sleep(0.05)
-                        
-                except Exception as category_error:
-                    logger.warning(f"Error fetching {category}: {category_error}")
-                    continue
-            
-            logger.info(f"Generated {len(all_pois)} POIs from live APIs")
+            logger.info("Generated %s POIs from live APIs", len(all_pois))
             return all_pois
             
         except Exception as e:
-            logger.error(f"Error generating POIs from APIs: {e}")
+            logger.error("Error generating POIs from APIs: %s", e)
             return []
     
+    async def _fetch_bbox_pois(
+        self,
+        bbox: List[float],
+        categories: List[str],
+        generated_for_location: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch POIs for the categories inside a bounding box, GEOAPIFY_CONCURRENCY
+        categories at a time. Stops starting new batches once `limit` POIs are
+        collected, so a capped search doesn't spend quota on every category.
+        Results keep the order of `categories`.
+        """
+        pois = []
+        async with httpx.AsyncClient(timeout=15) as client:
+            for start in range(0, len(categories), GEOAPIFY_CONCURRENCY):
+                results = await asyncio.gather(*(
+                    self._fetch_category_pois(client, category, bbox, generated_for_location)
+                    for category in categories[start:start + GEOAPIFY_CONCURRENCY]
+                ))
+                pois.extend(poi for category_pois in results for poi in category_pois)
+                if limit is not None and len(pois) >= limit:
+                    break
+        return pois[:limit] if limit is not None else pois
+    
+    async def _fetch_category_pois(
+        self,
+        client: httpx.AsyncClient,
+        category: str,
+        bbox: List[float],
+        generated_for_location: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Fetch one category's POIs from Geoapify (at most 50)"""
+        try:
+            url = "https://api.geoapify.com/v2/places"
+            params = {
+                "categories": category,
+                "filter": f"rect:{bbox[0]},{bbox[1]},{bbox[2]},{bbox[3]}",
+                "limit": 50,  # Get 50 POIs per category
+                "apiKey": self.geoapify_api_key
+            }
+            
+            response = await client.get(url, params=params)
+            if response.status_code != 200:
+                logger.warning("Geoapify error for %s: %s - %s", category, response.status_code, response.text)
+                return []
+            
+            pois = []
+            for feature in response.json().get("features", []):
+                props = feature.get("properties", {})
+                geometry = feature.get("geometry", {})
+                
+                if geometry.get("type") == "Point":
+                    coords = geometry.get("coordinates", [])
+                    
+                    pois.append({
+                        "poi_id": f"geoapify_{props.get('place_id', '')}",
+                        "name": props.get("name", "Unknown"),
+                        "location": {
+                            "type": "Point",
+                            "coordinates": [coords[0], coords[1]]  # [lng, lat]
+                        },
+                        "address": props.get("formatted", ""),
+                        "category": category,
+                        "category_parts": category.split("."),
+                        "subcategory": props.get("categories", [None])[0] if props.get("categories") else None,
+                        "opening_hours": props.get("opening_hours"),
+                        "rating": props.get("rating"),
+                        "source": "geoapify",
+                        "source_id": props.get("place_id", ""),
+                        "last_updated": datetime.utcnow(),
+                        "generated_for_location": generated_for_location
+                    })
+            return pois
+            
+        except Exception as category_error:
+            logger.warning("Error fetching %s: %s", category, category_error)
+            return []
+    
+    async def import_osm_pois(
+        self,
+        bbox: List[float],
+        categories: Optional[List[str]] = None
+    ) -> List[PublicPOI]:
+        """
+        Fetch OpenStreetMap-derived POIs (via Geoapify) for a bounding box.
+        
+        Args:
+            bbox: [min_lon, min_lat, max_lon, max_lat]
+            categories: Geoapify categories; defaults to DEFAULT_POI_CATEGORIES
+            
+        Returns:
+            Validated, de-duplicated POI models ready for store_public_data
+        """
+        if not self.geoapify_api_key:
+            logger.warning("No Geoapify API key - cannot import POI data")
+            return []
+        
+        raw_pois = await self._fetch_bbox_pois(bbox, categories or DEFAULT_POI_CATEGORIES)
+        pois = []
+        seen_ids = set()
+        for poi_data in raw_pois:
+            if poi_data["poi_id"] in seen_ids:
+                continue
+            seen_ids.add(poi_data["poi_id"])
+            try:
+                pois.append(PublicPOI(**poi_data))
+            except Exception as validation_error:
+                logger.warning("POI validation failed: %s", validation_error)
+        return pois
+    
     async def _store_new_pois(
         self, 
         db, 
@@ -421,20 +558,20 @@ class PublicDataService:
                 for poi_data in unique_new_pois:
                     try:
                         poi_model = PublicPOI(**poi_data)
-                        poi_models.append(poi_model.dict())
+                        poi_models.append(poi_model.to_mongo())
                     except Exception as validation_error:
-                        logger.warning(f"POI validation failed: {validation_error}")
+                        logger.warning("POI validation failed: %s", validation_error)
                         continue
                 
                 if poi_models:
-                    db.public_pois.insert_many(poi_models)
-                    logger.info(f"Successfully stored {len(poi_models)} new POIs")
+                    await db.public_pois.insert_many(poi_models)
+                    logger.info("Successfully stored %s new POIs", len(poi_models))
                     return len(poi_models)
             
             return 0
             
         except Exception as e:
-            logger.error(f"Error storing POIs: {e}")
+            logger.error("Error storing POIs: %s", e)
             return 0
 
     def _apply_intelligent_ranking(
@@ -515,7 +652,7 @@ class PublicDataService:
         # Sort by AI relevance score with diversity considerations
         enhanced_pois.sort(key=lambda x: x.get('ai_relevance_score', 0), reverse=True)
         
-        logger.info(f"Applied intelligent ranking with category diversity. Categories found: {list(category_counts.keys())}")
+        logger.info("Applied intelligent ranking with category diversity. Categories found: %s", list(category_counts.keys()))
         return enhanced_pois
 
     def _deduplicate_pois(self, pois: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -552,43 +689,15 @@ class PublicDataService:
     async def store_public_data(self, pois: List[PublicPOI]):
         """Store public POI data in MongoDB"""
         try:
-            with get_database() as db:
-                # Store POIs
-                if pois:
-                    poi_docs = [poi.dict() for poi in pois]
-                    db.public_pois.insert_many(poi_docs)
-                    logger.info(f"Stored {len(pois)} POIs")
-                
-                # Create indexes for efficient querying
-                self._create_indexes(db)
-                
-        except Exception as e:
-            logger.error(f"Error storing public data: {e}")
-    
-    def _create_indexes(self, db):
-        """Create indexes for efficient querying"""
-        try:
-            # POI indexes
-            db.public_pois.create_index([("location", "2dsphere")])
-            db.public_pois.create_index("category")
-            db.public_pois.create_index("source")
-            
-            # Text index for semantic search
-            try:
-                db.public_pois.create_index([
-                    ("name", "text"),
-                    ("category", "text"),
-                    ("subcategory", "text"),
-                    ("address", "text"),
-                    ("amenities", "text")
-                ])
-            except Exception as text_index_error:
-                logger.warning(f"Text index creation failed (may already exist): {text_index_error}")
-            
-            logger.info("Created database indexes")
+            db = get_db()
+            # Store POIs
+            if pois:
+                poi_docs = [poi.to_mongo() for poi in pois]
+                await db.public_pois.insert_many(poi_docs)
+                logger.info("Stored %s POIs", len(pois))
             
         except Exception as e:
-            logger.error(f"Error creating indexes: {e}")
+            logger.error("Error storing public data: %s", e)
 
 # Service instance
 public_data_service = PublicDataService() 
\ No newline at end of file
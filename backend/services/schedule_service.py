@@ -32,6 +32,7 @@ DEFAULT_VISIT_DURATION_MINUTES = {
 # No buffer time by default - travel times from Google already include some buffer
 TRAVEL_BUFFER_MINUTES = 0
 EARTH_RADIUS_KM = 6371  # Earth radius in kilometers for distance calculations
+DIRECTIONS_CONCURRENCY = 5  # Directions API legs requested at once
 
 # Speed estimates for fallback calculations when Google API is unavailable
 TRAVEL_SPEED_KM_PER_HOUR = {
@@ -62,7 +63,7 @@ async def generate_schedule(
         Schedule object with detailed timeline
     """
     try:
-        logger.info(f"Generating schedule for {len(places)} places starting at {start_time_str}")
+        logger.info("Generating schedule for %s places starting at %s", len(places), start_time_str)
         
         # Parse start and end times
         start_hour, start_minute = map(int, start_time_str.split(':'))
@@ -96,9 +97,9 @@ async def generate_schedule(
                 place_type = place.get('placeType', 'default')
                 place_types = [place_type]
                 visit_duration_minutes = get_visit_duration(place_types)
-                logger.info(f"Using default duration {visit_duration_minutes} mins for {place_name}")
+                logger.info("Using default duration %s mins for %s", visit_duration_minutes, place_name)
             else:
-                logger.info(f"Using AI-suggested duration {visit_duration_minutes} mins for {place_name}")
+                logger.info("Using AI-suggested duration %s mins for %s", visit_duration_minutes, place_name)
             
             # Calculate projected end time for this place
             projected_end_time = current_datetime + timedelta(minutes=visit_duration_minutes)
@@ -109,12 +110,12 @@ async def generate_schedule(
                 remaining_minutes = (end_datetime - current_datetime).total_seconds() / 60
                 
                 if remaining_minutes < 15:  # Less than 15 minutes left
-                    logger.warning(f"Stopping schedule at place {i} ({place_name}) - insufficient time remaining ({remaining_minutes:.1f} mins)")
+                    logger.warning("Stopping schedule at place %s (%s) - insufficient time remaining (%.1f mins)", i, place_name, remaining_minutes)
                     break
                 else:
                     # Adjust duration to fit remaining time (with 5-minute buffer)
                     adjusted_duration = max(15, int(remaining_minutes - 5))
-                    logger.warning(f"Adjusting duration for {place_name} from {visit_duration_minutes} to {adjusted_duration} mins to fit end time")
+                    logger.warning("Adjusting duration for %s from %s to %s mins to fit end time", place_name, visit_duration_minutes, adjusted_duration)
                     visit_duration_minutes = adjusted_duration
                     projected_end_time = current_datetime + timedelta(minutes=visit_duration_minutes)
             
@@ -134,9 +135,9 @@ async def generate_schedule(
             visit_start_datetime = current_datetime
             visit_end_datetime = visit_start_datetime + timedelta(minutes=visit_duration_minutes)
             
-            # Format times as strings (HH:MM)
-            visit_start_str = visit_start_datetime.strftime('%H:%M')
-            visit_end_str = visit_end_datetime.strftime('%H:%M')
+            # Times of day as minutes past midnight
+            visit_start_minutes = visit_start_datetime.hour * 60 + visit_start_datetime.minute
+            visit_end_minutes = visit_end_datetime.hour * 60 + visit_end_datetime.minute
             
             # Get AI review if present
             ai_review = place.get('ai_review')
@@ -145,8 +146,8 @@ async def generate_schedule(
             schedule_item = ScheduleItem(
                 place_id=place_id,
                 name=place_name,
-                start_time=visit_start_str,
-                end_time=visit_end_str,
+                start_time=visit_start_minutes,
+                end_time=visit_end_minutes,
                 duration_minutes=visit_duration_minutes,
                 ai_review=ai_review,
                 address=address,
@@ -178,7 +179,7 @@ async def generate_schedule(
                 # Check if adding travel time would exceed end time
                 travel_end_time = visit_end_datetime + timedelta(minutes=travel_time_minutes)
                 if travel_end_time > end_datetime:
-                    logger.warning(f"Stopping schedule - travel to next place would exceed end time at {travel_end_time.strftime('%H:%M')}")
+                    logger.warning("Stopping schedule - travel to next place would exceed end time at %s", travel_end_time.strftime("%H:%M"))
                     # Don't add travel segment, and stop processing
                     schedule_items.append(schedule_item)
                     break
@@ -192,7 +193,7 @@ async def generate_schedule(
                     polyline=polyline
                 )
                 
-                schedule_item.travel_to_next = route_segment
+                schedule_item = schedule_item.model_copy(update={"travel_to_next": route_segment})
                 total_distance_meters += distance_meters
                 
                 # Update current_datetime for the next place
@@ -208,7 +209,7 @@ async def generate_schedule(
             
             # Final check: if we've reached or exceeded end time, stop
             if current_datetime >= end_datetime:
-                logger.info(f"Schedule complete - reached end time constraint at {current_datetime.strftime('%H:%M')}")
+                logger.info("Schedule complete - reached end time constraint at %s", current_datetime.strftime("%H:%M"))
                 break
         
         # Add a dummy travel segment to the last place for map display purposes
@@ -222,13 +223,13 @@ async def generate_schedule(
                     lat = last_location.get('lat', 0)
                     lng = last_location.get('lng', 0)
                     
-                    last_item.travel_to_next = RouteSegment(
+                    schedule_items[-1] = last_item.model_copy(update={"travel_to_next": RouteSegment(
                         start_location=Coordinates(lat=lat, lng=lng),
                         end_location=Coordinates(lat=lat, lng=lng),
                         distance={"text": "0 m", "value": 0},
                         duration={"text": "0 mins", "value": 0},
                         polyline=""
-                    )
+                    )})
         
         # Calculate total schedule duration (from start to end of last activity)
         if schedule_items:
@@ -236,7 +237,7 @@ async def generate_schedule(
             
             # Validate the schedule doesn't exceed time constraints
             if current_datetime > end_datetime:
-                logger.error(f"SCHEDULE TIME OVERFLOW: Schedule ends at {current_datetime.strftime('%H:%M')} but should end by {end_time_str}")
+                logger.error("SCHEDULE TIME OVERFLOW: Schedule ends at %s but should end by %s", current_datetime.strftime("%H:%M"), end_time_str)
                 # Truncate to fit time constraint
                 total_duration_minutes = (end_datetime - start_datetime).total_seconds() / 60
         else:
@@ -251,7 +252,7 @@ async def generate_schedule(
         )
         
     except Exception as e:
-        logger.error(f"Error in generate_schedule: {e}")
+        logger.error("Error in generate_schedule: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to generate schedule: {str(e)}")
 
 def calculate_total_duration(start_datetime: datetime, end_datetime: datetime) -> int:
@@ -263,6 +264,10 @@ async def calculate_travel_data(places: List[Dict[str, Any]], travel_mode: Trave
     """
     Calculate travel times, distances and routes between sequential places using Google Maps API
     
+    Legs are requested concurrently (at most DIRECTIONS_CONCURRENCY at a time),
+    so routing a day costs about one Directions round trip per batch rather than
+    one per leg.
+    
     Args:
         places: List of places in sequential order
         travel_mode: Mode of transportation (walking, driving, bicycling, transit)
@@ -277,89 +282,97 @@ async def calculate_travel_data(places: List[Dict[str, Any]], travel_mode: Trave
     # Convert TravelMode enum to string for Google API
     travel_mode_str = travel_mode.value if isinstance(travel_mode, TravelMode) else travel_mode
     
+    # Bounds concurrent Directions requests to avoid rate limiting
+    semaphore = asyncio.Semaphore(DIRECTIONS_CONCURRENCY)
+    
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        async def leg(origin: Dict[str, Any], destination: Dict[str, Any]) -> Optional[Tuple[int, int, str]]:
+            async with semaphore:
+                return await _get_leg_travel_data(client, origin, destination, travel_mode, travel_mode_str)
+        
+        results = await asyncio.gather(
+            *(leg(places[i], places[i + 1]) for i in range(len(places) - 1)),
+            return_exceptions=True
+        )
+    
     travel_data = []
+    for result in results:
+        if result is None:
+            # Stop trying to use the API if the key is invalid
+            return []
+        if isinstance(result, Exception):
+            logger.error("Error getting directions: %s", result)
+            # Keep the legs before the failure, later ones fall back to distance estimation
+            break
+        travel_data.append(result)
     
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            for i in range(len(places) - 1):
-                origin = places[i]
-                destination = places[i + 1]
-                
-                # Get location coordinates
-                origin_location = origin.get('location', {})
-                dest_location = destination.get('location', {})
-                
-                origin_lat = origin_location.get('lat', 0)
-                origin_lng = origin_location.get('lng', 0)
-                dest_lat = dest_location.get('lat', 0)
-                dest_lng = dest_location.get('lng', 0)
+    return travel_data
 
-                # Validate coordinates
-                if not all([origin_lat, origin_lng, dest_lat, dest_lng]):
-                    logger.warning(f"Invalid coordinates: origin={origin_lat},{origin_lng}, dest={dest_lat},{dest_lng}")
-                    # Fallback to reasonable defaults based on travel mode
-                    fallback_duration = get_fallback_duration(travel_mode)
-                    travel_data.append((fallback_duration * 60, 5000, ""))
-                    continue
-                
-                # Format coordinates for API request
-                origin_str = f"{origin_lat},{origin_lng}"
-                destination_str = f"{dest_lat},{dest_lng}"
-                
-                # Make request to Google Directions API
-                response = await client.get(
-                    "https://maps.googleapis.com/maps/api/directions/json",
-                    params={
-                        "origin": origin_str,
-                        "destination": destination_str,
-                        "mode": travel_mode_str,
-                        "key": GOOGLE_MAPS_API_KEY
-                    }
-                )
-                
-                # Handle API errors
-                if response.status_code != 200:
-                    logger.error(f"Directions API error: {response.status_code}, {response.text}")
-                    # Fallback to distance estimation
-                    distance_km = haversine_distance(origin_lat, origin_lng, dest_lat, dest_lng)
-                    travel_time_mins = estimate_travel_time(distance_km, travel_mode)
-                    travel_data.append((travel_time_mins * 60, int(distance_km * 1000), ""))
-                    continue
-                
-                result = response.json()
-                
-                if result.get("status") == "REQUEST_DENIED":
-                    error_message = result.get("error_message", "Unknown API key error")
-                    logger.error(f"Google API key error: {error_message}")
-                    # Stop trying to use the API if the key is invalid
-                    return []
-                
-                if result.get("status") != "OK" or not result.get("routes"):
-                    logger.warning(f"No route found: {result.get('status')}")
-                    # Fallback to distance estimation
-                    distance_km = haversine_distance(origin_lat, origin_lng, dest_lat, dest_lng)
-                    travel_time_mins = estimate_travel_time(distance_km, travel_mode)
-                    travel_data.append((travel_time_mins * 60, int(distance_km * 1000), ""))
-                    continue
-                
-                # Extract route data
-                route = result["routes"][0]
-                leg = route["legs"][0]
-                
-                duration_seconds = leg["duration"]["value"]
-                distance_meters = leg["distance"]["value"]
-                polyline = route.get("overview_polyline", {}).get("points", "")
-                
-                travel_data.append((duration_seconds, distance_meters, polyline))
-                
-                # Add small delay to avoid rate limiting
-                await asyncio.sleep(0.2)
+async def _get_leg_travel_data(
+    client: httpx.AsyncClient,
+    origin: Dict[str, Any],
+    destination: Dict[str, Any],
+    travel_mode: TravelMode,
+    travel_mode_str: str
+) -> Optional[Tuple[int, int, str]]:
+    """
+    Get (duration_seconds, distance_meters, polyline) for one leg, estimating
+    from distance when Google has no route. Returns None if the API key is rejected.
+    """
+    # Get location coordinates
+    origin_location = origin.get('location', {})
+    dest_location = destination.get('location', {})
     
-    except Exception as e:
-        logger.error(f"Error getting directions: {e}")
-        # Return empty list, will fall back to distance estimation
+    origin_lat = origin_location.get('lat', 0)
+    origin_lng = origin_location.get('lng', 0)
+    dest_lat = dest_location.get('lat', 0)
+    dest_lng = dest_location.get('lng', 0)
+
+    # Validate coordinates
+    if not all([origin_lat, origin_lng, dest_lat, dest_lng]):
+        logger.warning("Invalid coordinates: origin=%s,%s, dest=%s,%s", origin_lat, origin_lng, dest_lat, dest_lng)
+        # Fallback to reasonable defaults based on travel mode
+        fallback_duration = get_fallback_duration(travel_mode)
+        return (fallback_duration * 60, 5000, "")
     
-    return travel_data
+    # Make request to Google Directions API
+    response = await client.get(
+        "https://maps.googleapis.com/maps/api/directions/json",
+        params={
+            "origin": f"{origin_lat},{origin_lng}",
+            "destination": f"{dest_lat},{dest_lng}",
+            "mode": travel_mode_str,
+            "key": GOOGLE_MAPS_API_KEY
+        }
+    )
+    
+    # Handle API errors
+    if response.status_code != 200:
+        logger.error("Directions API error: %s, %s", response.status_code, response.text)
+        # Fallback to distance estimation
+        distance_km = haversine_distance(origin_lat, origin_lng, dest_lat, dest_lng)
+        travel_time_mins = estimate_travel_time(distance_km, travel_mode)
+        return (travel_time_mins * 60, int(distance_km * 1000), "")
+    
+    result = response.json()
+    
+    if result.get("status") == "REQUEST_DENIED":
+        error_message = result.get("error_message", "Unknown API key error")
+        logger.error("Google API key error: %s", error_message)
+        return None
+    
+    if result.get("status") != "OK" or not result.get("routes"):
+        logger.warning("No route found: %s", result.get("status"))
+        # Fallback to distance estimation
+        distance_km = haversine_distance(origin_lat, origin_lng, dest_lat, dest_lng)
+        travel_time_mins = estimate_travel_time(distance_km, travel_mode)
+        return (travel_time_mins * 60, int(distance_km * 1000), "")
+    
+    # Extract route data
+    route = result["routes"][0]
+    leg = route["legs"][0]
+    
+    return (leg["duration"]["value"], leg["distance"]["value"], route.get("overview_polyline", {}).get("points", ""))
 
 def get_fallback_duration(travel_mode: TravelMode) -> int:
     """Get a reasonable fallback duration in minutes based on travel mode"""
@@ -3,7 +3,8 @@ from datetime import datetime
 from typing import Dict, Any, Optional
 from bson.objectid import ObjectId
 from pymongo.errors import PyMongoError
-from db import get_database
+from db import get_db, push_archived_lists
+from utils.cache import response_cache, archived_lists_cache_key
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -24,56 +25,53 @@ class UserService:
             bool: True if example list was added or already exists, False on error
         """
         try:
-            with get_database() as db:
-                # Check if user already has any archived lists
-                user_lists = db.archived_lists.find_one({"user_id": user_id})
-                
-                # If user already has lists, check if they have the example list
-                if user_lists and user_lists.get("lists"):
-                    # Check if any list has the name "Example"
-                    for list_item in user_lists["lists"]:
-                        if list_item.get("name") == "Example":
-                            logger.info(f"User {user_id} already has example list")
-                            return True
-                
-                # Get the example list from the example_lists collection
-                example_list_template = db.example_lists.find_one({"name": "Example"})
-                
-                if not example_list_template:
-                    logger.error("Example list template not found in database")
-                    return False
-                
-                user_example_list = {
-                    "_id": str(ObjectId()),  # Generate new unique ID for this user's copy
-                    "name": example_list_template["name"],
-                    "places": example_list_template["places"],
-                    "note": example_list_template.get("note", ""),
-                    "date": datetime.utcnow(),  # Set current date when added to user
-                    "saved_schedules": [],  # Start with empty schedules for new users
-                    "similar_public_places": example_list_template.get("similar_public_places", []),
-                    "popularity_score": example_list_template.get("popularity_score"),
-                    "ai_generated_tags": example_list_template.get("ai_generated_tags", [])
-                }
-                
-                # Add the example list to the user's archived lists
-                result = db.archived_lists.update_one(
-                    {"user_id": user_id},
-                    {"$push": {"lists": user_example_list}},
-                    upsert=True
-                )
+            db = get_db()
+            # Check if user already has the example list. The user_id index
+            # finds the user's single document and lists.name is matched within
+            # it; only _id comes back, so returning users never pull their lists
+            if await db.archived_lists.find_one({"user_id": user_id, "lists.name": "Example"}, {"_id": 1}):
+                logger.debug("User %s already has example list", user_id)
+                return True
+            
+            # Get the example list from the example_lists collection
+            example_list_template = await db.example_lists.find_one({"name": "Example"})
+            
+            if not example_list_template:
+                logger.error("Example list template not found in database")
+                return False
+            
+            user_example_list = {
+                "_id": str(ObjectId()),  # Generate new unique ID for this user's copy
+                "name": example_list_template["name"],
+                "places": example_list_template["places"],
+                "note": example_list_template.get("note", ""),
+                "date": datetime.utcnow(),  # Set current date when added to user
+                "saved_schedules": [],  # Start with empty schedules for new users
+                "similar_public_places": example_list_template.get("similar_public_places", []),
+                "popularity_score": example_list_template.get("popularity_score"),
+                "ai_generated_tags": example_list_template.get("ai_generated_tags", [])
+            }
+            
+            # Add the example list to the user's archived lists
+            result = await db.archived_lists.update_one(
+                {"user_id": user_id},
+                push_archived_lists([user_example_list]),
+                upsert=True
+            )
+            await response_cache.invalidate(archived_lists_cache_key(user_id))
+            
+            if result.upserted_id or result.modified_count > 0:
+                logger.info("✅ Example list added to user %s", user_id)
+                return True
+            else:
+                logger.error("Failed to add example list to user %s", user_id)
+                return False
                 
-                if result.upserted_id or result.modified_count > 0:
-                    logger.info(f"✅ Example list added to user {user_id}")
-                    return True
-                else:
-                    logger.error(f"Failed to add example list to user {user_id}")
-                    return False
-                    
         except PyMongoError as e:
-            logger.error(f"Database error adding example list to user {user_id}: {e}")
+            logger.error("Database error adding example list to user %s: %s", user_id, e)
             return False
         except Exception as e:
-            logger.error(f"Unexpected error adding example list to user {user_id}: {e}")
+            logger.error("Unexpected error adding example list to user %s: %s", user_id, e)
             return False
     
     @staticmethod
@@ -93,20 +91,20 @@ class UserService:
                 logger.error("User ID not found in user data")
                 return False
             
-            logger.info(f"Initializing new user: {user_id}")
+            logger.info("Initializing new user: %s", user_id)
             
             # Add the example list to the new user
             success = await UserService.ensure_user_has_example_list(user_id)
             
             if success:
-                logger.info(f"✅ User {user_id} initialized successfully with example list")
+                logger.info("✅ User %s initialized successfully with example list", user_id)
             else:
-                logger.warning(f"⚠️ User {user_id} initialized but example list addition failed")
+                logger.warning("⚠️ User %s initialized but example list addition failed", user_id)
             
             return success
             
         except Exception as e:
-            logger.error(f"Error initializing user: {e}")
+            logger.error("Error initializing user: %s", e)
             return False
 
 # Create a singleton instance
@@ -1,13 +1,257 @@
+import asyncio
+import hashlib
 import logging
+import re
+import time
+import httpx
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Request, HTTPException, Depends
-from google.oauth2 import id_token
-from google.auth.transport import requests as grequests
-from typing import Dict, Any
+from google.auth import jwt
+from typing import Dict, Any, Optional, Tuple
 from config import GOOGLE_CLIENT_ID
+from utils.cache import response_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Google's ID token signing certificates (PEM, keyed by "kid"). They are
+# fetched once and reused until the response's max-age runs out, or until a
+# token names a key we haven't seen (Google rotated its keys)
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = frozenset({"accounts.google.com", "https://accounts.google.com"})
+DEFAULT_CERTS_MAX_AGE = 3600
+# An unknown kid refetches at most once per CERTS_MIN_REFRESH_SECONDS, so
+# forged tokens with random kids can't turn every request into a fetch
+CERTS_MIN_REFRESH_SECONDS = 60
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+_google_certs: Dict[str, str] = {}
+_google_certs_expire_at = 0.0
+_google_certs_fetched_at = 0.0
+_google_certs_lock = asyncio.Lock()
+_certs_client = httpx.AsyncClient(timeout=10.0)
+
+# Verified tokens are remembered until they expire (capped at the TTL) so
+# repeat requests skip signature verification. Entries are keyed by a
+# 16-byte BLAKE2b digest of the token so raw tokens are not retained in memory
+TOKEN_CACHE_MAXSIZE = 4096
+TOKEN_CACHE_TTL_SECONDS = 300
+_token_cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+# Tokens logged out before they expire, with their expiry. Revocations are
+# kept in-process and checked only when a token isn't in _token_cache (a
+# revoked token is always dropped from it). Other workers learn of them over
+# Redis pub/sub; revoked:<digest> keys, expiring with the token, cover
+# workers that started after the announcement
+REVOKED_TOKENS_MAXSIZE = 4096
+REVOCATIONS_CHANNEL = "revoked-tokens"
+_revoked_tokens: "OrderedDict[bytes, float]" = OrderedDict()
+
+# Signature verification on a cache miss is CPU-bound, so it runs on a small
+# dedicated pool instead of the event loop
+_VERIFY_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="google-verify")
+
+def _certs_fresh(kid: Optional[str]) -> bool:
+    return time.time() < _google_certs_expire_at and (kid is None or kid in _google_certs)
+
+def _certs_recently_fetched() -> bool:
+    return time.time() < _google_certs_expire_at and time.time() - _google_certs_fetched_at < CERTS_MIN_REFRESH_SECONDS
+
+async def get_google_certs(kid: Optional[str] = None) -> Dict[str, str]:
+    """
+    Get Google's token signing certificates, refreshing them when stale.
+    
+    Args:
+        kid: Key id from the token header; an unknown id forces a refresh,
+            unless the certificates were fetched in the last minute
+        
+    Returns:
+        Mapping of key id to PEM certificate
+        
+    Raises:
+        ValueError: If kid is unknown and the certificates are current
+    """
+    global _google_certs, _google_certs_expire_at, _google_certs_fetched_at
+    if _certs_fresh(kid):
+        return _google_certs
+    if _certs_recently_fetched():
+        raise ValueError(f"Unknown token key id: {kid}")
+    async with _google_certs_lock:
+        # Another request may have refreshed them while we waited
+        if _certs_fresh(kid):
+            return _google_certs
+        if _certs_recently_fetched():
+            raise ValueError(f"Unknown token key id: {kid}")
+        response = await _certs_client.get(GOOGLE_CERTS_URL)
+        response.raise_for_status()
+        match = _MAX_AGE_RE.search(response.headers.get("cache-control", ""))
+        _google_certs = response.json()
+        _google_certs_fetched_at = time.time()
+        _google_certs_expire_at = _google_certs_fetched_at + (int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE)
+        logger.info("Refreshed Google token certificates (%s keys)", len(_google_certs))
+    if kid is not None and kid not in _google_certs:
+        raise ValueError(f"Unknown token key id: {kid}")
+    return _google_certs
+
+async def close_certs_client() -> None:
+    """Close the connection pool used for certificate refreshes (app shutdown)"""
+    await _certs_client.aclose()
+
+def _decode_google_token(token: str, certs: Dict[str, str]) -> Dict[str, Any]:
+    """Check a Google ID token's signature, expiry, audience and issuer (pure CPU)"""
+    idinfo = jwt.decode(token, certs=certs, audience=GOOGLE_CLIENT_ID)
+    if idinfo.get("iss") not in GOOGLE_ISSUERS:
+        raise ValueError(f"Wrong issuer: {idinfo.get('iss')}")
+    return idinfo
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+def _revoked_key(key: bytes) -> str:
+    return f"revoked:{key.hex()}"
+
+async def _verify_signature(token: str) -> Dict[str, Any]:
+    """Check a token against Google's certificates off the event loop"""
+    certs = await get_google_certs(jwt.decode_header(token).get("kid"))
+    return await asyncio.get_running_loop().run_in_executor(
+        _VERIFY_POOL, _decode_google_token, token, certs
+    )
+
+def _remember_revoked(key: bytes, expires_at: float) -> None:
+    _revoked_tokens[key] = expires_at
+    if len(_revoked_tokens) > REVOKED_TOKENS_MAXSIZE:
+        _revoked_tokens.popitem(last=False)
+
+def _forget_token(key: bytes, expires_at: float) -> None:
+    """Drop a revoked token's cached claims and remember it as revoked"""
+    _token_cache.pop(key, None)
+    _remember_revoked(key, expires_at)
+
+async def _is_revoked(key: bytes, now: float) -> bool:
+    """Whether a token missing from _token_cache was revoked, here or by another worker"""
+    revoked_until = _revoked_tokens.get(key)
+    if revoked_until is not None:
+        if revoked_until > now:
+            return True
+        del _revoked_tokens[key]
+        return False
+    revoked_until = await response_cache.get_value(_revoked_key(key))
+    if revoked_until is None:
+        return False
+    _remember_revoked(key, float(revoked_until))
+    return True
+
+async def revoke_token(token: str) -> None:
+    """
+    Reject a token in every worker from now until it expires, e.g. after logout.
+    
+    Only genuine, unexpired Google tokens are recorded, so arbitrary input
+    can't fill the revocation store.
+    """
+    key = _token_key(token)
+    _token_cache.pop(key, None)
+    try:
+        idinfo = await _verify_signature(token)
+    except Exception as e:
+        logger.info("Not revoking invalid token: %s", e)
+        return
+    expires_at = int(idinfo["exp"])
+    _forget_token(key, expires_at)
+    await response_cache.set_value_until(_revoked_key(key), str(expires_at).encode(), expires_at)
+    await response_cache.publish(REVOCATIONS_CHANNEL, f"{key.hex()}:{expires_at}".encode())
+
+def _on_revocation(message: bytes) -> None:
+    """Apply a revocation announced by another worker"""
+    try:
+        key_hex, expires_at = message.decode().split(":")
+        _forget_token(bytes.fromhex(key_hex), float(expires_at))
+    except ValueError:
+        logger.warning("Ignoring malformed token revocation: %r", message)
+
+async def listen_for_revocations() -> None:
+    """Apply other workers' token revocations until cancelled (run once per process)"""
+    await response_cache.subscribe(REVOCATIONS_CHANNEL, _on_revocation)
+
+async def verify_google_token(token: str) -> Dict[str, Any]:
+    """
+    Verify a Google ID token, returning cached claims for tokens seen recently.
+    
+    Args:
+        token: The raw Google ID token
+        
+    Returns:
+        The verified token claims
+        
+    Raises:
+        ValueError: If the token is invalid or expired
+    """
+    now = time.time()
+    key = _token_key(token)
+    # Revoked tokens are never in the cache, so a hit needs no revocation check
+    cached = _token_cache.get(key)
+    if cached:
+        idinfo, expires_at = cached
+        if expires_at > now:
+            _token_cache.move_to_end(key)
+            return idinfo
+        del _token_cache[key]
+    if await _is_revoked(key, now):
+        raise ValueError("Token has been revoked")
+    
+    idinfo = await _verify_signature(token)
+    now = time.time()
+    expires_at = min(float(idinfo.get("exp", now)), now + TOKEN_CACHE_TTL_SECONDS)
+    _token_cache[key] = (idinfo, expires_at)
+    if len(_token_cache) > TOKEN_CACHE_MAXSIZE:
+        _token_cache.popitem(last=False)
+    return idinfo
+
+def user_from_claims(idinfo: Dict[str, Any]) -> Dict[str, Any]:
+    """The user dict handed to routes, built from verified token claims"""
+    return {
+        "id": idinfo["sub"],
+        "email": idinfo["email"],
+        "name": idinfo.get("name"),
+        "picture": idinfo.get("picture"),
+    }
+
+SESSION_COOKIE = b"session="
+
+def _session_cookie(request: Request) -> Optional[str]:
+    """
+    Read the session cookie straight from the raw ASGI headers.
+    
+    Only the one cookie is sliced out, so the full Cookie header is never
+    parsed into a dict. Quoted values fall back to Starlette's parser.
+    """
+    for name, value in request.scope["headers"]:
+        if name != b"cookie":
+            continue
+        start = 0
+        while True:
+            start = value.find(SESSION_COOKIE, start)
+            if start == -1:
+                break
+            # Must be the start of a cookie pair, not the tail of another name
+            if start == 0 or value[start - 1] in b"; ":
+                start += len(SESSION_COOKIE)
+                end = value.find(b";", start)
+                token = value[start:end if end != -1 else None].strip()
+                if token.startswith(b'"'):
+                    return request.cookies.get("session")
+                return token.decode("latin-1") or None
+            start += len(SESSION_COOKIE)
+    return None
+
+def request_token(request: Request) -> Optional[str]:
+    """The bearer token from the Authorization header, else the session cookie"""
+    # Try Authorization header first (Bearer token)
+    auth_header = request.headers.get("authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header.split(" ")[1]
+    # Fallback to cookie for backward compatibility
+    return _session_cookie(request)
+
 async def get_current_user(request: Request) -> Dict[str, Any]:
     """
     Dependency to get current user from Authorization header.
@@ -21,25 +265,12 @@ async def get_current_user(request: Request) -> Dict[str, Any]:
     Raises:
         HTTPException: If user is not logged in or token is invalid
     """
-    # Try Authorization header first (Bearer token)
-    auth_header = request.headers.get("authorization")
-    if auth_header and auth_header.startswith("Bearer "):
-        token = auth_header.split(" ")[1]
-    else:
-        # Fallback to cookie for backward compatibility
-        token = request.cookies.get("session")
-    
+    token = request_token(request)
     if not token:
         raise HTTPException(status_code=401, detail="Not logged in")
     
     try:
-        idinfo = id_token.verify_oauth2_token(token, grequests.Request(), GOOGLE_CLIENT_ID)
-        return {
-            "id": idinfo["sub"],
-            "email": idinfo["email"],
-            "name": idinfo.get("name"),
-            "picture": idinfo.get("picture"),
-        }
+        return user_from_claims(await verify_google_token(token))
     except Exception as e:
-        logger.error(f"Token verification failed: {e}")
+        logger.error("Token verification failed: %s", e)
         raise HTTPException(status_code=401, detail="Invalid session") 
\ No newline at end of file
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import logging
+import orjson
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from fastapi import Response
+from config import settings
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    from redis import asyncio as aioredis
+    from redis.exceptions import RedisError
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    RedisError = Exception
+
+# Pause before resubscribing after a lost pub/sub connection
+SUBSCRIBE_RETRY_SECONDS = 5
+
+class ResponseCache:
+    """
+    Redis-backed cache of rendered response bodies, shared by every worker.
+
+    Entries for one user live in a single hash (one field per query variant),
+    so a write invalidates all of that user's cached responses with one DEL.
+    Caching is disabled when REDIS_URL is unset or redis is not installed,
+    and Redis errors degrade to a cache miss rather than failing the request.
+    """
+
+    def __init__(self, url: Optional[str]):
+        self._redis = None
+        if url and REDIS_AVAILABLE:
+            self._redis = aioredis.from_url(url)
+            logger.info("Response cache enabled (Redis)")
+        elif url:
+            logger.warning("REDIS_URL set but redis is not installed; response cache disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return self._redis is not None
+
+    async def get(self, key: str, field: str) -> Optional[bytes]:
+        if not self._redis:
+            return None
+        try:
+            return await self._redis.hget(key, field)
+        except RedisError as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+
+    async def set(self, key: str, field: str, body: bytes, expire: int) -> None:
+        if not self._redis:
+            return
+        try:
+            async with self._redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, field, body)
+                pipe.expire(key, expire)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    async def get_value(self, key: str) -> Optional[bytes]:
+        if not self._redis:
+            return None
+        try:
+            return await self._redis.get(key)
+        except RedisError as e:
+            logger.warning("Response cache read failed: %s", e)
+            return None
+
+    async def set_value(self, key: str, value: bytes, expire: int) -> None:
+        if not self._redis:
+            return
+        try:
+            await self._redis.set(key, value, ex=expire)
+        except RedisError as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    async def set_value_until(self, key: str, value: bytes, expire_at: int) -> None:
+        """Store a value that expires at a unix timestamp (SET EXAT)"""
+        if not self._redis:
+            return
+        try:
+            await self._redis.set(key, value, exat=expire_at)
+        except RedisError as e:
+            logger.warning("Response cache write failed: %s", e)
+
+    async def acquire_lock(self, key: str, expire: int) -> bool:
+        """
+        Take a short-lived lock (SET NX EX) so only one worker refills a cold key.
+        
+        Always succeeds when caching is disabled or Redis is unreachable, so
+        callers fall back to doing the work themselves.
+        """
+        if not self._redis:
+            return True
+        try:
+            return bool(await self._redis.set(f"{key}:lock", b"1", nx=True, ex=expire))
+        except RedisError as e:
+            logger.warning("Response cache lock failed: %s", e)
+            return True
+
+    async def release_lock(self, key: str) -> None:
+        await self.invalidate(f"{key}:lock")
+
+    async def publish(self, channel: str, message: bytes) -> None:
+        if not self._redis:
+            return
+        try:
+            await self._redis.publish(channel, message)
+        except RedisError as e:
+            logger.warning("Response cache publish failed: %s", e)
+
+    async def subscribe(self, channel: str, handler: Callable[[bytes], None]) -> None:
+        """
+        Call handler with every message published on a channel, until cancelled.
+        
+        Returns at once when caching is disabled; resubscribes after Redis errors.
+        """
+        if not self._redis:
+            return
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(channel)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            handler(message["data"])
+            except RedisError as e:
+                logger.warning("Response cache subscription to %s failed: %s", channel, e)
+                await asyncio.sleep(SUBSCRIBE_RETRY_SECONDS)
+
+    async def get_response(self, key: str, field: str) -> Optional[Response]:
+        """Replay a cached JSON response (body plus any cached headers), or None on a miss"""
+        cached = await self.get(key, field)
+        if cached is None:
+            return None
+        headers, body = cached.split(b"\n", 1)
+        return Response(content=body, media_type="application/json", headers=orjson.loads(headers))
+
+    async def set_response(
+        self,
+        key: str,
+        field: str,
+        response: Response,
+        expire: int,
+        headers: Iterable[str] = ()
+    ) -> None:
+        """Cache a rendered JSON response; only the named headers are kept"""
+        if not self._redis:
+            return
+        kept = {name: response.headers[name] for name in headers if name in response.headers}
+        await self.set(key, field, orjson.dumps(kept) + b"\n" + response.body, expire)
+
+    async def invalidate(self, key: str) -> None:
+        if not self._redis:
+            return
+        try:
+            await self._redis.delete(key)
+        except RedisError as e:
+            logger.warning("Response cache invalidation failed: %s", e)
+
+    async def close(self) -> None:
+        if self._redis:
+            await self._redis.aclose()
+
+response_cache = ResponseCache(settings.REDIS_URL)
+
+# Seconds a cached archive list response stays valid without a write
+ARCHIVED_LISTS_CACHE_TTL = 30
+
+def archived_lists_cache_key(user_id: str) -> str:
+    """Cache hash holding every cached archive list/schedule response for a user"""
+    return f"lists:{user_id}"
+
+# Seconds a parsed AI model answer is reused for an identical prompt
+AI_RESPONSE_CACHE_TTL = 3600
+
+def ai_response_cache_key(model: str, prompt: str) -> str:
+    """Cache key for a model's parsed answer to an exact prompt"""
+    return f"ai:{hashlib.sha1(f'{model}|{prompt}'.encode()).hexdigest()}"
+
+# Rendered create_schedule responses, reused when a client resubmits the same
+# request (retries, toggling the travel mode back)
+SCHEDULE_CACHE_TTL = 300
+# Longer free-form prompts are rarely resubmitted verbatim, so they aren't cached
+SCHEDULE_CACHE_MAX_PROMPT_LENGTH = 100
+
+def schedule_cache_key(fields: Dict[str, Any]) -> str:
+    """Cache key for a schedule generated from these request fields, independent of key order"""
+    digest = hashlib.blake2b(orjson.dumps(fields, option=orjson.OPT_SORT_KEYS), digest_size=16)
+    return f"schedule:{digest.hexdigest()}"
+
+# Nearby-POI enrichment results, one key per set of place coordinates. Each
+# entry expires on its own, so POIs stored since are picked up within the TTL
+ENRICHMENT_CACHE_TTL = 3600
+
+def enrichment_cache_key(points: Iterable[Tuple[float, float]]) -> str:
+    """Cache key for the enrichment of places at these (lat, lng) points, in order"""
+    digest = hashlib.blake2b(orjson.dumps([[round(lat, 6), round(lng, 6)] for lat, lng in points]), digest_size=16)
+    return f"enrichment:{digest.hexdigest()}"
+
+# Google Places responses, kept only briefly: they carry open-now status
+# (currentOpeningHours) and photo references that go stale, and Google's terms
+# don't allow Places content to be stored long term. Enough to absorb repeat
+# searches and detail views within a session
+PLACES_SEARCH_CACHE_TTL = 300
+PLACE_DETAILS_CACHE_TTL = 300
+
+def places_search_cache_key(endpoint: str, payload: bytes) -> str:
+    """Cache key for a Places search; payloads come from a model, so key order is fixed"""
+    digest = hashlib.blake2b(endpoint.encode() + b"|" + payload, digest_size=16)
+    return f"places:{digest.hexdigest()}"
+
+def place_details_cache_key(place_id: str) -> str:
+    """Cache key for a place's details"""
+    return f"place:{place_id}"